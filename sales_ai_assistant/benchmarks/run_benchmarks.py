@@ -0,0 +1,310 @@
+"""
+Offline benchmarks for the audio pipeline.
+
+Run from the sales_ai_assistant directory:
+
+    python -m benchmarks.run_benchmarks run --duration 300 --speakers 3
+    python -m benchmarks.run_benchmarks run --models real --output before.json
+    python -m benchmarks.run_benchmarks compare before.json after.json
+
+`run` synthesizes a multi-speaker recording, benchmarks the full recording
+pipeline (VAD, diarization, speaker labelling, ASR), transcribe_audio_bytes on live
+chunks and merge_audio_chunks. Each result carries wall and CPU time, real-time
+factor, throughput per core and peak RSS, plus the git commit, so result files
+from different commits can be compared. `compare` prints the change per metric
+and exits non-zero when any metric regressed beyond --threshold.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCHMARKS = ["pipeline", "transcribe_audio_bytes", "merge_audio_chunks"]
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+# Metrics where a higher value is better; every other compared metric is lower-is-better
+HIGHER_IS_BETTER = {"throughputPerCore"}
+COMPARED_METRICS = ["wallSeconds", "cpuSeconds", "rtf", "throughputPerCore", "peakRssBytes"]
+
+
+def git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {"gitSha": git("rev-parse", "HEAD"), "gitDirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def measure(fn, audio_seconds: float, repeats: int) -> dict:
+    """Run `fn` once to warm up (model loads), then `repeats` times; report medians."""
+    from src.services.model_registry import current_rss_bytes
+    from src.services.metrics_service import PeakRss
+
+    started = time.perf_counter()
+    fn()
+    cold_seconds = time.perf_counter() - started
+
+    runs = []
+    peak_rss = PeakRss().start()
+    for _ in range(repeats):
+        rss_before = current_rss_bytes()
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        extra = fn() or {}
+        runs.append({
+            "wallSeconds": round(time.perf_counter() - started, 4),
+            "cpuSeconds": round(time.process_time() - cpu_started, 4),
+            "rssDeltaBytes": current_rss_bytes() - rss_before,
+            **extra,
+        })
+
+    peak_rss.stop()
+
+    wall = statistics.median(run["wallSeconds"] for run in runs)
+    cpu = statistics.median(run["cpuSeconds"] for run in runs)
+    return {
+        "audioSeconds": round(audio_seconds, 2),
+        "coldWallSeconds": round(cold_seconds, 4),
+        "wallSeconds": wall,
+        "cpuSeconds": cpu,
+        "rtf": round(wall / audio_seconds, 5) if audio_seconds else None,
+        # Seconds of audio processed per CPU-second
+        "throughputPerCore": round(audio_seconds / cpu, 3) if cpu else None,
+        "peakRssBytes": peak_rss.peak,
+        "runs": runs,
+    }
+
+
+def bench_pipeline(samples, repeats: int) -> dict:
+    from src.services.recording_pipeline import transcribe_recording
+    from src.services.speaker_identification import (
+        get_segment_embeddings, load_audio_tensor, load_pyannote_embedding, SPEAKER_EMBEDDING_SOURCE
+    )
+    from src.services.salesperson_matcher import SalespersonMatcher
+    from src.services.metrics_service import start_trace, finish_trace
+    from src.services.audio_io import duration_seconds
+    from benchmarks.stub_models import speech_regions
+
+    # The first detected speech region stands in for the salesperson's enrolled sample
+    start, end = speech_regions(samples)[0]
+    if SPEAKER_EMBEDDING_SOURCE == "pyannote":
+        reference = [load_pyannote_embedding(samples[int(start * 16000):int(end * 16000)])]
+    else:
+        reference = get_segment_embeddings(load_audio_tensor(samples), [(start, end)])
+    matcher = SalespersonMatcher(reference)
+
+    def run_once():
+        async def traced():
+            trace = start_trace("benchmark")
+            try:
+                segments = await transcribe_recording(samples, matcher)
+            finally:
+                doc = finish_trace(trace)
+            return segments, doc
+
+        segments, doc = asyncio.run(traced())
+        stages = {}
+        for span in doc["spans"]:
+            stages[span["stage"]] = stages.get(span["stage"], 0.0) + span["wallSeconds"]
+        return {"segments": len(segments), "stages": stages}
+
+    result = measure(run_once, duration_seconds(samples), repeats)
+    result["stages"] = {
+        name: statistics.median(run["stages"].get(name, 0.0) for run in result["runs"])
+        for name in result["runs"][0]["stages"]
+    }
+    return result
+
+
+def bench_transcribe_audio_bytes(samples, chunk_seconds: float, repeats: int) -> dict:
+    from src.services.transcription_service import transcribe_audio_bytes
+    from src.services.audio_io import encode_canonical_wav, duration_seconds
+    from benchmarks.synthetic_audio import split_chunks
+
+    chunks = [encode_canonical_wav(chunk) for chunk in split_chunks(samples, chunk_seconds)]
+
+    def run_once():
+        return {"characters": sum(len(transcribe_audio_bytes(chunk)) for chunk in chunks)}
+
+    result = measure(run_once, duration_seconds(samples), repeats)
+    result["chunks"] = len(chunks)
+    return result
+
+
+def bench_merge_audio_chunks(samples, chunk_seconds: float, repeats: int) -> dict:
+    from src.services.audio_merge_service import merge_audio_chunks
+    from src.services.audio_io import encode_canonical_wav, duration_seconds
+    from benchmarks.synthetic_audio import split_chunks
+
+    if shutil.which("ffmpeg") is None:
+        return {"skipped": "ffmpeg not found"}
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for index, chunk in enumerate(split_chunks(samples, chunk_seconds)):
+            path = os.path.join(directory, f"chunk_{index}.wav")
+            with open(path, "wb") as f:
+                f.write(encode_canonical_wav(chunk))
+            paths.append(path)
+        output_path = os.path.join(directory, "merged.wav")
+
+        result = measure(lambda: merge_audio_chunks(paths, output_path), duration_seconds(samples), repeats)
+        result["chunks"] = len(paths)
+        return result
+
+
+def run(args) -> dict:
+    # Settings read at import time by the services
+    os.environ["TRANSCRIPT_CACHE_ENABLED"] = "false"  # every repeat must do the work
+    os.environ["VAD_ENABLED"] = "true" if args.vad else "false"
+
+    from benchmarks.synthetic_audio import synthesize_meeting
+    from src.services.ml_executor import shutdown_ml_pools, ML_POOL_SIZES
+
+    if args.models == "stub":
+        from benchmarks.stub_models import register_stub_models
+        register_stub_models(args.speakers)
+
+    samples, turns = synthesize_meeting(args.duration, args.speakers, args.seed)
+    print(f"[BENCH] {args.duration:.0f}s synthetic recording, {args.speakers} speakers, {len(turns)} turns")
+
+    report = {
+        **git_revision(),
+        "createdAt": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpuCount": os.cpu_count(),
+        "models": args.models,
+        "params": {
+            "embeddingSource": os.getenv("SPEAKER_EMBEDDING_SOURCE", "pyannote"),
+            "duration": args.duration,
+            "speakers": args.speakers,
+            "seed": args.seed,
+            "chunkSeconds": args.chunk_seconds,
+            "repeats": args.repeats,
+            "vad": args.vad,
+            "mlPoolSizes": ML_POOL_SIZES,
+        },
+        "benchmarks": {},
+    }
+
+    selected = args.benchmarks.split(",") if args.benchmarks else BENCHMARKS
+    try:
+        for name in selected:
+            print(f"[BENCH] {name}...")
+            if name == "pipeline":
+                result = bench_pipeline(samples, args.repeats)
+            elif name == "transcribe_audio_bytes":
+                result = bench_transcribe_audio_bytes(samples, args.chunk_seconds, args.repeats)
+            elif name == "merge_audio_chunks":
+                result = bench_merge_audio_chunks(samples, args.chunk_seconds, args.repeats)
+            else:
+                raise SystemExit(f"Unknown benchmark: {name}")
+            report["benchmarks"][name] = result
+            if "skipped" in result:
+                print(f"[BENCH] {name}: skipped ({result['skipped']})")
+            else:
+                print(f"[BENCH] {name}: {result['wallSeconds']:.3f}s wall, RTF {result['rtf']}, "
+                      f"{result['throughputPerCore']} audio s per CPU s")
+    finally:
+        shutdown_ml_pools()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{(report['gitSha'] or 'unknown')[:10]}-{args.models}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[BENCH] Results written to {output}")
+    return report
+
+
+def compare_reports(baseline: dict, current: dict, threshold: float) -> list:
+    """Print metric changes between two reports and return the regressions."""
+    if baseline.get("params", {}).get("duration") != current.get("params", {}).get("duration") \
+            or baseline.get("models") != current.get("models"):
+        print("[BENCH] Warning: reports were produced with different parameters or models")
+
+    print(f"{'benchmark':<24}{'metric':<28}{'baseline':>14}{'current':>14}{'change':>10}")
+    regressions = []
+    for name, current_result in current.get("benchmarks", {}).items():
+        baseline_result = baseline.get("benchmarks", {}).get(name)
+        if not baseline_result or "skipped" in baseline_result or "skipped" in current_result:
+            continue
+
+        metrics = [(metric, baseline_result.get(metric), current_result.get(metric)) for metric in COMPARED_METRICS]
+        for stage_name, value in current_result.get("stages", {}).items():
+            metrics.append((f"stage:{stage_name}", baseline_result.get("stages", {}).get(stage_name), value))
+
+        for metric, before, after in metrics:
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = ""
+            if worse > threshold:
+                flag = "  REGRESSION"
+                regressions.append({"benchmark": name, "metric": metric, "baseline": before, "current": after})
+            print(f"{name:<24}{metric:<28}{before:>14.4g}{after:>14.4g}{change:>+9.1%}{flag}")
+    return regressions
+
+
+def compare(args) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    print(f"[BENCH] {baseline.get('gitSha', '?')[:10]} -> {current.get('gitSha', '?')[:10]}")
+    regressions = compare_reports(baseline, current, args.threshold)
+    if regressions:
+        print(f"[BENCH] {len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the audio pipeline on synthetic recordings.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks and write a JSON report")
+    run_parser.add_argument("--models", choices=["stub", "real"], default="stub")
+    run_parser.add_argument("--duration", type=float, default=120.0, help="Recording length in seconds")
+    run_parser.add_argument("--speakers", type=int, default=3)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--chunk-seconds", type=float, default=10.0, help="Live chunk length")
+    run_parser.add_argument("--repeats", type=int, default=3)
+    run_parser.add_argument("--no-vad", dest="vad", action="store_false")
+    run_parser.add_argument("--benchmarks", help=f"Comma-separated subset of {','.join(BENCHMARKS)}")
+    run_parser.add_argument("--output", help="Report path (default benchmarks/results/<sha>-<models>.json)")
+    run_parser.add_argument("--compare", help="Baseline report to compare the new results against")
+    run_parser.add_argument("--threshold", type=float, default=0.10, help="Relative change counted as a regression")
+
+    compare_parser = commands.add_parser("compare", help="Compare two JSON reports")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.command == "compare":
+        return compare(args)
+
+    report = run(args)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        return 1 if compare_reports(baseline, report, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
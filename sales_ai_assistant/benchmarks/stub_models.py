@@ -0,0 +1,188 @@
+from collections import namedtuple
+import numpy as np
+
+from src.services.model_registry import register_model
+
+# Cheap stand-ins for the ML models, registered under the same names as the real
+# ones. They take and return the same shapes, and their cost scales with the
+# audio length. A benchmark run against them measures the pipeline's own overhead
+# (decoding, VAD, slicing, batching, alignment, labelling), without the models.
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.02
+EMBEDDING_DIM = 192
+WORD_SECONDS = 0.35
+
+Segment = namedtuple("Segment", ["start", "end"])
+WhisperSegment = namedtuple("WhisperSegment", ["start", "end", "text", "words"])
+WhisperWord = namedtuple("WhisperWord", ["start", "end", "word", "probability"])
+TranscriptionInfo = namedtuple("TranscriptionInfo", ["language", "language_probability", "duration"])
+
+
+def _as_array(audio) -> np.ndarray:
+    if isinstance(audio, dict):  # pyannote-style {"waveform": (channel, time), "sample_rate"}
+        audio = audio["waveform"]
+    if hasattr(audio, "numpy"):
+        audio = audio.detach().cpu().numpy()
+    if isinstance(audio, str):
+        from src.services.audio_io import decode_audio_bytes
+        with open(audio, "rb") as f:
+            audio = decode_audio_bytes(f.read())
+    audio = np.asarray(audio, dtype=np.float32)
+    return audio.mean(axis=0) if audio.ndim > 1 else audio
+
+
+def speech_regions(audio: np.ndarray, min_gap: float = 0.3) -> list:
+    """(start, end) seconds of frames above an energy threshold, merging short gaps."""
+    frame = int(FRAME_SECONDS * SAMPLE_RATE)
+    count = len(audio) // frame
+    if count == 0:
+        return []
+    energy = np.sqrt((audio[:count * frame].reshape(count, frame) ** 2).mean(axis=1))
+    active = energy > max(energy.max() * 0.05, 1e-3)
+
+    regions = []
+    for index in np.flatnonzero(active):
+        start, end = index * FRAME_SECONDS, (index + 1) * FRAME_SECONDS
+        if regions and start - regions[-1][1] <= min_gap:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+    return [(round(float(start), 3), round(float(end), 3)) for start, end in regions]
+
+
+class StubAnnotation:
+    def __init__(self, tracks: list):
+        self.tracks = tracks
+
+    def itertracks(self, yield_label: bool = False):
+        for index, (start, end, label) in enumerate(self.tracks):
+            turn = Segment(start, end)
+            yield (turn, index, label) if yield_label else (turn, index)
+
+
+    def labels(self) -> list:
+        return sorted({label for _, _, label in self.tracks})
+
+
+class StubDiarization:
+    """Energy regions as turns, labelled by dominant frequency band."""
+
+    def __init__(self, speakers: int = 3):
+        self.speakers = speakers
+        self.encoder = StubSpeakerEncoder()
+        # Embedding model of the pipeline, like SpeakerDiarization._embedding
+        self._embedding = StubPyannoteEmbedding()
+
+    def __call__(self, audio, return_embeddings: bool = False, **kwargs):
+        samples = _as_array(audio)
+        tracks = []
+        for start, end in speech_regions(samples):
+            segment = samples[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+            crossings = np.count_nonzero(np.diff(np.signbit(segment))) / max(len(segment), 1)
+            tracks.append((start, end, f"SPEAKER_{int(crossings * 400) % self.speakers:02d}"))
+        annotation = StubAnnotation(tracks)
+        if not return_embeddings:
+            return annotation
+
+        # One centroid per label, in labels() order like pyannote
+        centroids = []
+        for label in annotation.labels():
+            speech = np.concatenate([
+                samples[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)] for start, end, other in tracks if other == label
+            ])
+            centroids.append(self.encoder._embed(speech))
+        return annotation, np.stack(centroids) if centroids else np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+
+
+class StubSpeakerEncoder:
+    """Log band energies projected to EMBEDDING_DIM, same speaker gives close vectors."""
+
+    def __init__(self, bands: int = 64, seed: int = 0):
+        self.bands = bands
+        self.projection = np.random.default_rng(seed).normal(size=(bands, EMBEDDING_DIM)).astype(np.float32)
+
+    def _embed(self, samples: np.ndarray) -> np.ndarray:
+        spectrum = np.abs(np.fft.rfft(samples, n=max(len(samples), 2)))
+        bands = np.array_split(spectrum, self.bands)
+        features = np.log1p(np.array([band.mean() for band in bands], dtype=np.float32))
+        return features @ self.projection
+
+    def encode_batch(self, wavs, wav_lens=None):
+        import torch
+        batch = wavs.detach().cpu().numpy()
+        batch = batch if batch.ndim > 1 else batch[None]
+        lengths = wav_lens.detach().cpu().numpy() if wav_lens is not None else np.ones(len(batch))
+        out = [self._embed(row[:max(int(round(length * row.shape[0])), 1)]) for row, length in zip(batch, lengths)]
+        return torch.from_numpy(np.stack(out)).unsqueeze(1)
+
+
+class StubPyannoteEmbedding:
+    """PretrainedSpeakerEmbedding API: (batch, channel, samples) -> (batch, dim) array."""
+
+    def __init__(self):
+        self.encoder = StubSpeakerEncoder()
+
+    def __call__(self, waveforms, masks=None):
+        batch = waveforms.detach().cpu().numpy() if hasattr(waveforms, "numpy") else np.asarray(waveforms)
+        batch = batch.reshape(batch.shape[0], -1)
+        return np.stack([self.encoder._embed(row) for row in batch])
+
+
+def _stub_words(samples: np.ndarray) -> list:
+    words = []
+    for start, end in speech_regions(samples):
+        position = start
+        while position < end:
+            words.append((position, min(position + WORD_SECONDS, end), f" word{len(words)}"))
+            position += WORD_SECONDS
+    return words
+
+
+class StubOpenAIWhisper:
+    """openai-whisper API: transcribe() returns {"text", "segments": [...]}."""
+
+    def transcribe(self, audio, word_timestamps: bool = False, **kwargs):
+        words = _stub_words(_as_array(audio))
+        text = "".join(word for _, _, word in words).strip()
+        segment = {
+            "start": words[0][0] if words else 0.0,
+            "end": words[-1][1] if words else 0.0,
+            "text": text,
+        }
+        if word_timestamps:
+            segment["words"] = [{"word": word, "start": start, "end": end} for start, end, word in words]
+        return {"text": text, "segments": [segment] if words else []}
+
+
+class StubFasterWhisper:
+    """faster-whisper API: transcribe() returns (segments generator, info)."""
+
+    def transcribe(self, audio, word_timestamps: bool = False, **kwargs):
+        samples = _as_array(audio)
+        words = _stub_words(samples)
+
+        def segments():
+            for start, end, word in words:
+                stub_words = [WhisperWord(start, end, word, 1.0)] if word_timestamps else None
+                yield WhisperSegment(start, end, word, stub_words)
+
+        return segments(), TranscriptionInfo("en", 1.0, len(samples) / SAMPLE_RATE)
+
+    def decode_batch(self, audios: list, languages: list) -> list:
+        """Batched decode hook used by BatchedTranscriber instead of CTranslate2."""
+        results = []
+        for audio, language in zip(audios, languages):
+            text = "".join(word for _, _, word in _stub_words(_as_array(audio))).strip()
+            results.append((text, language or "en", 1.0))
+        return results
+
+
+def register_stub_models(speakers: int = 3):
+    """Replace every audio model in the registry with its stub."""
+    register_model("pyannote_diarization", lambda: StubDiarization(speakers))
+    for name in ("ecapa", "ecapa_onnx", "ecapa_onnx_int8"):
+        register_model(name, StubSpeakerEncoder)
+    register_model("openai_whisper_large", StubOpenAIWhisper)
+    register_model("faster_whisper_base", StubFasterWhisper)
+    register_model("faster_whisper_large_int8", StubFasterWhisper)
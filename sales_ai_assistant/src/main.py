@@ -13,6 +13,9 @@ from src.routes.llmTesting import router as llm_testing_router
 from src.services.meeting_scheduler import start_meeting_scheduler
 import asyncio
 from src.routes.external_meeting_routes import router as join_meeting
+from src.routes.system import router as system_router
+from src.services.ml_executor import shutdown_ml_pools
+from src.services.llm_response_cache import ensure_ttl_index
 
 app = FastAPI(title="Audio Uploader with Transcription & Diarization")
 
@@ -31,8 +34,16 @@ for route in app.routes:
     if isinstance(route, APIRoute):
         print(f"{route.path} -> methods: {route.methods}")
 app.include_router(llm_testing_router, prefix="/api/llm", tags=["LLM Testing"])
+app.include_router(system_router, prefix="/api/system", tags=["System"])
 
 @app.on_event("startup")
 async def startup_event():
     # Start the meeting scheduler in the background
     asyncio.create_task(start_meeting_scheduler())
+    # Expiry of cached LLM answers
+    await ensure_ttl_index()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Stop the ML worker pools
+    shutdown_ml_pools()
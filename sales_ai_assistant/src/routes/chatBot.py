@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-from src.services.prediction_models_service import run_instruction
+from src.services.prediction_models_service import run_instruction_async, fit_shared_content
+from src.services.transcript_summarizer import fit_transcript
+from src.services.token_budget import content_budget
 from typing import Optional, List,Dict
 from bson import ObjectId
 from src.routes.auth import verify_token
@@ -14,6 +16,7 @@ class ChatBotRequest(BaseModel):
     description: Optional[str] = None
     product_details: Optional[str] = None
     requested_sections: Optional[List[str]] = None  # ✅ Add this line
+    refresh: Optional[bool] = False  # regenerate instead of returning cached answers
 
 class ChatBotResponse(BaseModel):
     results: dict  # Return all meeting sections
@@ -32,6 +35,7 @@ class EmailSummaryRequest(BaseModel):
     product_details: Optional[str] = None
     requested_sections: Optional[List[str]] = None
     userEmail: Optional[str] = None
+    refresh: Optional[bool] = False  # regenerate instead of returning cached answers
 
 class EmailSummaryResponse(BaseModel):
     results: Dict[str, str]
@@ -39,7 +43,7 @@ class EmailSummaryResponse(BaseModel):
 
 # Updated dynamic version with customizable input and sections
 @router.post("/chat-bot", response_model=ChatBotResponse)
-async def chat_bot(request: ChatBotRequest):
+async def chat_bot(request: ChatBotRequest, http_request: Request):
     try:
         # Example formatted transcript - replace with actual if needed
         formatted_transcript = request.message
@@ -47,7 +51,12 @@ async def chat_bot(request: ChatBotRequest):
         description = request.description or "No description provided."
         product_details = request.product_details or "No product details available."
 
-        base_context = f"Meeting Description: {description}\nProduct Details: {product_details}\nTranscript:\n{formatted_transcript}"
+        # Long transcripts are condensed into notes that fit the LLM context
+        header = f"Meeting Description: {description}\nProduct Details: {product_details}\n"
+        transcript_text, condensed = await fit_transcript(formatted_transcript, content_budget(300, header),
+                                                          request=http_request, use_cache=not request.refresh)
+        transcript_label = "Meeting Notes" if condensed else "Transcript"
+        base_context = f"{header}{transcript_label}:\n{transcript_text}"
         # All available instruction templates
         all_instructions = {
             "Meeting Details": "Extract the meeting date (if available), time, participants, organizer, and duration.",
@@ -64,11 +73,16 @@ async def chat_bot(request: ChatBotRequest):
         instructions = all_instructions  # Default: all sections
 
         results = {}
+        # Snapshot the evaluated context only when several sections reuse it
+        share_context = len(instructions) > 1
         for section, instruction in instructions.items():
-            results[section] = run_instruction(instruction, base_context)
+            results[section] = await run_instruction_async(instruction, base_context, request=http_request,
+                                                           share_context=share_context, use_cache=not request.refresh)
 
         return ChatBotResponse(results=results)
 
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -142,7 +156,7 @@ async def get_revenue_summary(organizationId: str, token_data: dict = Depends(ve
 
 
 @router.post("/email-bot", response_model=EmailSummaryResponse)
-async def email_summary(request: EmailSummaryRequest):
+async def email_summary(request: EmailSummaryRequest, http_request: Request):
     try:
         # Construct base context using input
         description = request.description or "No description provided."
@@ -168,14 +182,22 @@ async def email_summary(request: EmailSummaryRequest):
             k: v for k, v in default_instructions.items()
             if not request.requested_sections or k in request.requested_sections
         }
+        if instructions:
+            # Cut long emails once, from the end, so every section shares the same context
+            base_context = await fit_shared_content(list(instructions.values()), base_context, keep="start")
 
         # Run LLM for each instruction
         results = {}
+        # Snapshot the evaluated context only when several sections reuse it
+        share_context = len(instructions) > 1
         for section, instruction in instructions.items():
-            results[section] = run_instruction(instruction, base_context)
+            results[section] = await run_instruction_async(instruction, base_context, request=http_request,
+                                                           share_context=share_context, use_cache=not request.refresh)
 
         return EmailSummaryResponse(results=results)
 
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
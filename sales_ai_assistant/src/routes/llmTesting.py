@@ -1,31 +1,53 @@
+import asyncio
 from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import JSONResponse
 import uvicorn
-import os
-from langchain.llms import LlamaCpp
+from typing import Any, List, Optional
+from langchain.llms.base import LLM
 
 # from langchain_community.llms import LlamaCpp
 
 from langchain.chains import ConversationChain
-from langchain.memory import ConversationBufferMemory
+from langchain.memory import ConversationTokenBufferMemory
+from src.services.prediction_models_service import llm_service
+from src.services.llm_service import complete
+from src.services.model_registry import LLM_CONTEXT_TOKENS
+from src.services.token_budget import count_tokens, fit_content, PROMPT_OVERHEAD_TOKENS
 
 router = APIRouter()
 
-# Initialize the LlamaCpp model with your Mistral 7B GGUF model path
 
-MODEL_PATH = os.path.abspath("src/prediction_models/mistral-7b-instruct-v0.1.Q4_K_M.gguf")
+class SharedLlamaCpp(LLM):
+    """LangChain wrapper around the shared Mistral 7B instance from the model registry."""
 
-llm = LlamaCpp(
-    model_path=MODEL_PATH,
-    n_ctx=4096,
-    temperature=0.7,
-    max_tokens=1024,
-    n_threads=8,
-    verbose=True,
-)
+    temperature: float = 0.7
+    max_tokens: int = 1024
+
+    @property
+    def _llm_type(self) -> str:
+        return "shared_llama_cpp"
+
+    def get_num_tokens(self, text: str) -> int:
+        # Used by the token buffer memory; LangChain's default is a GPT-2 tokenizer
+        return count_tokens(text)
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        prompt, max_tokens = fit_content(prompt, self.max_tokens)
+        # Blocks this thread until the LLM inference thread has run the prompt
+        output = llm_service().call(
+            complete,
+            prompt,
+            max_tokens=max_tokens,
+            temperature=self.temperature,
+            stop=stop or [],
+        )
+        return output["choices"][0]["text"]
+
+
+llm = SharedLlamaCpp()
 
 # Dictionary to keep conversation chains by session_id (user)
-conversations = {9}
+conversations = {}
 
 @router.post("/chat")
 async def chat(request: Request):
@@ -38,13 +60,17 @@ async def chat(request: Request):
 
     # Create conversation with memory if it doesn't exist
     if session_id not in conversations:
-        memory = ConversationBufferMemory()
+        # Keeps the most recent turns that fit beside the template, the new message and the answer
+        memory = ConversationTokenBufferMemory(
+            llm=llm, max_token_limit=LLM_CONTEXT_TOKENS - llm.max_tokens - PROMPT_OVERHEAD_TOKENS
+        )
         conversations[session_id] = ConversationChain(llm=llm, memory=memory)
 
     conversation = conversations[session_id]
 
     # Run the conversation chain
-    response = conversation.run(user_message)
+    # The chain calls the LLM synchronously, keep it off the event loop
+    response = await asyncio.to_thread(conversation.run, user_message)
 
     return JSONResponse(content={"response": response})
 
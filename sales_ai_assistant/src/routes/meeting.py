@@ -1,7 +1,7 @@
 from typing import List, Optional,Dict
 from src.common.extract_calendly_events import extract_calendly_events
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Body, Depends,  Request
-import uuid, tempfile, os
+import uuid, os
 import asyncio
 import json
 from collections import defaultdict
@@ -10,26 +10,32 @@ from enum import Enum
 from pydantic import BaseModel
 from bson import ObjectId
 
-import tempfile
 import os
-from src.services.prediction_models_service import run_instruction
-from src.services.speaker_identification import load_reference_embedding, process_segments, run_diarization
+from src.services.prediction_models_service import run_instruction_async
+from src.services.llm_service import LLMRequestCancelled, PRIORITY_BACKGROUND
+from src.services.transcript_summarizer import fit_transcript
+from src.services.token_budget import content_budget
 from src.services.s3_service import upload_file_to_s3, download_file_from_s3
 from src.services.mongo_service import (
-    calendar_events_tasks_collection_save, get_calendar_event_by_id_only, get_salesperson_sample, save_chunk_metadata, get_chunk_list, save_final_audio, 
+    calendar_events_tasks_collection_save, get_calendar_event_by_id_only, save_chunk_metadata, get_chunk_list, save_final_audio, 
     save_suggestion, update_final_summary_and_suggestion, get_calendar_event_by_id,
     update_calendar_event, save_calendar_event,
     get_googlemeeting_by_id,
     download_audio_from_url,
-    save_transcript_to_db
+    save_transcript_to_db,
+    save_speaker_registry,
+    save_pipeline_metrics
 )
 from src.services.audio_merge_service import merge_audio_chunks
-from src.services.whisper_service import transcribe_audio
-from src.services.diarization_service import diarize_audio
-from src.services.mongo_service import save_salesperson_sample
-
-from src.services.speaker_identification import process_segments, run_diarization, load_reference_embedding
-from src.services.transcription_service import transcribe_audio_bytes
+from src.services.voice_enrollment_service import enroll_salesperson_sample, get_salesperson_matcher
+from src.services.ml_executor import run_in_ml_pool
+from src.services.streaming_transcription_service import push_audio_chunk, finish_stream
+from src.services.audio_io import ingest_audio_bytes, duration_seconds
+from src.services.recording_pipeline import transcribe_recording, prefetch_in_order
+from src.services.speaker_registry import SpeakerRegistry
+from src.services.metrics_service import start_trace, finish_trace, stage
+
+from src.services.transcription_service import transcribe_audio_bytes_async
 from src.services.mongo_service import save_transcription_chunk
 from src.utils import extract_filename_from_s3_url
 
@@ -40,6 +46,22 @@ from src.routes.auth import verify_token
 
 router = APIRouter()
 
+# Transcribe live chunks incrementally as they arrive
+LIVE_TRANSCRIPTION_ENABLED = os.getenv("LIVE_TRANSCRIPTION_ENABLED", "false").lower() in ("1", "true", "yes")
+# Answer the sales questions of the live transcript after each chunk and store
+# them as the meeting's suggestion
+LIVE_SUGGESTIONS_ENABLED = os.getenv("LIVE_SUGGESTIONS_ENABLED", "false").lower() in ("1", "true", "yes")
+
+async def store_trace(trace, error: str = None):
+    """Close a pipeline trace and store it with the meeting's metrics."""
+    if trace.wall_seconds is not None:
+        return  # already stored
+    doc = finish_trace(trace, error)
+    try:
+        await save_pipeline_metrics(doc)
+    except Exception as e:
+        print(f"[METRICS] Could not store metrics for {trace.meeting_id}: {e}")
+
 class MeetingStatus(str, Enum):
     SCHEDULED = "scheduled"
     START = "start"
@@ -70,19 +92,16 @@ async def upload_salesperson_audio(
         raise HTTPException(400, detail="Missing userId or file")
 
     content = await file.read()
-    s3_key = f"salesperson_samples_audio/{userId}_{file.filename}"
-    s3_url = upload_file_to_s3(s3_key, content)
-
-    doc_id = await save_salesperson_sample(
-        filename=file.filename,
-        s3_url=s3_url,
-        userId=userId
-    )
+    try:
+        enrollment = await enroll_salesperson_sample(userId, file.filename, content)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not process voice sample: {str(e)}")
 
     return {
         "message": "Audio sample uploaded",
-        "id": str(doc_id),
-        "s3_url": s3_url
+        "id": str(enrollment["id"]),
+        "s3_url": enrollment["s3_url"],
+        "sampleCount": enrollment["sample_count"]
     }
 
 
@@ -108,6 +127,10 @@ async def upload_chunk(
     # Transcribe the uploaded audio chunk
     # transcript = transcribe_audio_bytes(content)
     transcript = "test"
+    if LIVE_TRANSCRIPTION_ENABLED:
+        # Normalise to 16 kHz mono once
+        samples, _ = await run_in_ml_pool("audio", ingest_audio_bytes, content)
+        transcript = await run_in_ml_pool("whisper", push_audio_chunk, meetingId, samples)
 
     # Save the chunk metadata
     await save_chunk_metadata(meetingId, chunk_name, userId, transcript, s3_url, eventId, container_id)
@@ -155,6 +178,10 @@ async def upload_chunk_google_meet(
         # Transcribe the uploaded audio chunk
         # transcript = transcribe_audio_bytes(content)
         transcript = "test"
+        if LIVE_TRANSCRIPTION_ENABLED:
+            # Normalise to 16 kHz mono once
+            samples, _ = await run_in_ml_pool("audio", ingest_audio_bytes, content)
+            transcript = await run_in_ml_pool("whisper", push_audio_chunk, meeting_id, samples)
 
         print(f"transcript {transcript}")
         # Save the chunk metadata
@@ -189,22 +216,32 @@ async def handle_post_processing(meetingId: str, userId: str):
         description = meeting.get("description", "")
         product_details = meeting.get("product_details", "")
 
-        # Prompt to detect questions and respond if directed to sales person
+        # Prompt to detect questions and respond if directed to sales person. The
+        # transcript is the prompt content only (not repeated in the instruction),
+        # so the token budget can drop its oldest turns when the meeting runs long.
         instruction = (
-            f"The following is a transcript of a meeting about {product_details}.\n"
-            f"Meeting Description: {description}\n"
-            f"Transcript:\n{full_transcript}\n\n"
+            f"The above is a transcript of a meeting about {product_details}.\n"
+            f"Meeting Description: {description}\n\n"
             f"Step 1: Identify any questions asked during the meeting that are directed to a sales person.\n"
             f"Step 2: For each such question, provide a concise and professional answer from the perspective of a knowledgeable sales person.\n"
             f"Format the response as a list of Q&A pairs like:\n"
             f"Q: [the question]\nA: [the sales person's answer]\n"
         )
 
-        # Run LLM model to get answers
-        response = await run_instruction(instruction, full_transcript)  # assuming this is an async call
-        print(f"Sales Q&A response: {response}")
-        
         suggestions = "test"
+        if LIVE_SUGGESTIONS_ENABLED:
+            # Run LLM model to get answers. Behind interactive requests, and only
+            # the newest transcript of the meeting stays queued. The transcript
+            # grows with every chunk, a cached answer would never be reused.
+            try:
+                suggestions = await run_instruction_async(
+                    instruction, full_transcript, use_cache=False,
+                    priority=PRIORITY_BACKGROUND, latest_key=f"suggestions:{meetingId}"
+                )
+            except LLMRequestCancelled:
+                return  # a newer chunk's job will store the suggestions
+            print(f"Sales Q&A response: {suggestions}")
+
         print(f"suggestion result is ............. {suggestions}")
         # Save suggestions
         await save_suggestion(meetingId, userId, transcript=full_transcript, suggestion=suggestions)
@@ -242,7 +279,7 @@ async def upload_audio_chunk(
     print(f"[STEP] S3 URL: {s3_url}")
 
     print("[STEP] Transcribing audio chunk...")
-    transcript = transcribe_audio_bytes(audio_bytes)
+    transcript = await transcribe_audio_bytes_async(audio_bytes, meetingId)
     print(f"[STEP] Transcript: {transcript}")
 
     print("[STEP] Saving transcription metadata to MongoDB...")
@@ -264,41 +301,61 @@ async def get_meeting_transcripts(meetingId: str, userId: str):
     if not meeting or meeting.get("user_id") != userId:
         raise HTTPException(status_code=404, detail="Meeting not found")
     recordings = meeting.get("recordings", [])
-    transcript_objs_all = []
-    updated_recordings = []
-    ref_path=os.path.join(os.path.dirname(__file__),"../host2.wav")
-    ref_embedding=load_reference_embedding(ref_path)
-    for rec in recordings:
-        if "transcript" in rec and rec["transcript"]:
-            updated_recordings.append(rec)
-            transcript_objs_all.extend(rec["transcript"])
+    # Speaker labels shared by all recordings of this meeting
+    speaker_registry = SpeakerRegistry.from_dict(meeting.get("speakerRegistry"))
+
+    async def fetch_recording(rec):
+        audio_bytes = None
+        if rec.get("canonical_url"):
+            # Our own artifact lives in the private bucket, read it with the S3 client
+            try:
+                canonical_key = extract_filename_from_s3_url(rec["canonical_url"])
+                audio_bytes = await asyncio.to_thread(download_file_from_s3, canonical_key)
+            except Exception as e:
+                if not rec.get("url"):
+                    print(f"[INGEST] Skipping recording {rec['canonical_url']}: canonical audio unavailable ({e}) "
+                          f"and no original URL")
+                    return None
+                print(f"[INGEST] Canonical audio unavailable ({e}), using the original recording")
+                rec.pop("canonical_url", None)
+        if audio_bytes is None:
+            audio_bytes = await download_audio_from_url(rec.get("url"))
+        audio, canonical_wav = await run_in_ml_pool("audio", ingest_audio_bytes, audio_bytes)
+        canonical_url = rec.get("canonical_url")
+        if not canonical_url:
+            # Keep the 16 kHz mono artifact so retries skip decoding and resampling
+            canonical_key = f"canonical_recording/{meetingId}/{uuid.uuid4()}.wav"
+            canonical_url = await asyncio.to_thread(upload_file_to_s3, canonical_key, canonical_wav)
+        return audio, canonical_url
+
+    def collect_transcripts():
+        return [seg for rec in recordings for seg in (rec.get("transcript") or [])]
+
+    # Download upcoming recordings while the current one is being transcribed
+    pending = [rec for rec in recordings if not rec.get("transcript") and (rec.get("canonical_url") or rec.get("url"))]
+    if pending:
+        # Only needed when something is left to transcribe
+        ref_path=os.path.join(os.path.dirname(__file__),"../host2.wav")
+        ref_embedding=await get_salesperson_matcher(userId, meeting.get("organizationId"), fallback_path=ref_path)
+    async for rec, fetched in prefetch_in_order(pending, fetch_recording):
+        if fetched is None:
             continue
-        audio_url=rec.get("url")
-        if audio_url:
-            audio_bytes=await download_audio_from_url(audio_url)
-
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-                temp_file.write(audio_bytes)
-                temp_file_path = temp_file.name
-
-            # Run diarization and transcription
-            diarization = run_diarization(temp_file_path)
-            transcript_objs = process_segments(diarization, temp_file_path, ref_embedding)
+        audio, canonical_url = fetched
+        # Run VAD, diarization and transcription
+        rec["transcript"] = await transcribe_recording(audio, ref_embedding, speaker_registry, meeting_id=meetingId)
+        # Recorded only once finished, the partial saves below must not store
+        # artifacts of recordings that were prefetched but not transcribed
+        rec["canonical_url"] = canonical_url
+        del audio
 
+        # Save after every recording so a failure later on keeps finished work
+        await save_speaker_registry(meetingId, speaker_registry.to_dict())
+        await save_transcript_to_db(meetingId, collect_transcripts(), recordings)
 
-            rec["transcript"] = transcript_objs
-            transcript_objs_all.extend(transcript_objs)
-
-
-            # Delete temp file
-            os.remove(temp_file_path)
-
-        updated_recordings.append(rec)
-     
-    
+    transcript_objs_all = collect_transcripts()
 
     # Save transcript and recordings using your reusable function
-    await save_transcript_to_db(meetingId, transcript_objs_all, updated_recordings)
+    await save_transcript_to_db(meetingId, transcript_objs_all, recordings)
 
 
     # Return transcript as part of response
@@ -318,22 +375,29 @@ async def finalize_offline_session(
     if not meetingId or not eventId or not userId:
         raise HTTPException(status_code=400, detail="Missing meetingId or eventId ,userId")
 
-    temp_dir = tempfile.mkdtemp()
     local_files = []
     final_path = None
     sample_path = None
+    trace = start_trace("finalize_offline", meetingId, eventId=eventId, userId=userId)
 
     try:
-        # Read and save the final audio file
-        audio_bytes = await file.read()
+        # Read the final audio file and normalise it to 16 kHz mono once
+        with stage("read_upload") as span:
+            audio_bytes = await file.read()
+            span["bytes"] = len(audio_bytes)
+        with stage("ingest") as span:
+            audio, canonical_wav = await run_in_ml_pool("audio", ingest_audio_bytes, audio_bytes)
+            span["audioSeconds"] = duration_seconds(audio)
+        trace.attributes["audioSeconds"] = round(duration_seconds(audio), 2)
 
         BASE_DIR = os.path.dirname(__file__)
         local_audio_dir = os.path.join(BASE_DIR, "../../recordings", meetingId)
         os.makedirs(local_audio_dir, exist_ok=True)  # Ensure directory exists
     
         final_path = os.path.join(local_audio_dir, f"{eventId}_final.wav")
-        with open(final_path, "wb") as f:
-            f.write(audio_bytes)
+        with stage("write_local"):
+            with open(final_path, "wb") as f:
+                f.write(canonical_wav)
 
         # Upload final audio to S3
         s3_key = f"final_recording/{meetingId}/{eventId}/final.wav"
@@ -353,15 +417,21 @@ async def finalize_offline_session(
         BASE_DIR = os.path.dirname(__file__)
         sample_path = os.path.join(BASE_DIR, "../host2.wav")
 
-        # Load reference embedding from local sample file
-        ref_embedding = load_reference_embedding(sample_path)
+        # Enrolled reps of the organization, local sample only if the user never enrolled
+        with stage("reference_embeddings"):
+            meeting = await get_meeting_by_id(meetingId) or {}
+            ref_embedding = await get_salesperson_matcher(userId, meeting.get("organizationId"), fallback_path=sample_path)
 
-        # Run diarization and process
-        diarization = run_diarization(final_path)
-        results = process_segments(diarization, final_path, ref_embedding)
+        # Run VAD, diarization and transcription on the ingested samples
+        with stage("transcribe_recording", audio_seconds=duration_seconds(audio)):
+            results = await transcribe_recording(audio, ref_embedding, meeting_id=meetingId)
+
+        # The final transcript supersedes the live one
+        finish_stream(meetingId, flush=False)
 
         # Save the final audio metadata
-        doc_id = await save_final_audio(meetingId, s3_url, results, userId)
+        with stage("save_results"):
+            doc_id = await save_final_audio(meetingId, s3_url, results, userId)
 
         # Update calendar event status
         calendar_event = await get_calendar_event_by_id_only(eventId)
@@ -373,6 +443,8 @@ async def finalize_offline_session(
                 "message": "Meeting recording completed",
             })
 
+        await store_trace(trace)
+
         # Run post-processing in background
         asyncio.create_task(handle_finalize_post_processing(meetingId, userId, results, eventId))
 
@@ -384,7 +456,11 @@ async def finalize_offline_session(
         }
 
     except Exception as e:
+        await store_trace(trace, error=str(e))
         raise HTTPException(status_code=500, detail=f"Error processing final session: {str(e)}")
+    finally:
+        # Closes the trace when the task was cancelled; a no-op once stored
+        await store_trace(trace, error="interrupted")
     # finally:
     #     # Clean up temporary files
     #     for file in local_files:
@@ -399,6 +475,7 @@ async def finalize_offline_session(
 
 
 async def handle_finalize_post_processing(meetingId: str, userId: str, transcript: str, eventId: str):
+    trace = start_trace("finalize_post_processing", meetingId, eventId=eventId, userId=userId)
     try:
         # Get meeting metadata
         meeting = await get_meeting_by_id(meetingId)
@@ -426,7 +503,14 @@ async def handle_finalize_post_processing(meetingId: str, userId: str, transcrip
             # f"Product Details: {product_details}"
         )
 
-        base_context = f"Meeting Description: {description}\nProduct Details: {product_details}\nTranscript:\n{formatted_transcript}"
+        # Meetings longer than the LLM context are condensed into notes first;
+        # each section answers in up to 300 tokens
+        header = f"Meeting Description: {description}\nProduct Details: {product_details}\n"
+        with stage("llm:condense"):
+            transcript_text, condensed = await fit_transcript(formatted_transcript, content_budget(300, header))
+        transcript_label = "Meeting Notes" if condensed else "Transcript"
+
+        base_context = f"{header}{transcript_label}:\n{transcript_text}"
 
         suggestion_instruction = (
             f"Suggest improvements based on the following meeting.\n"
@@ -435,7 +519,8 @@ async def handle_finalize_post_processing(meetingId: str, userId: str, transcrip
         )
 
         # --- Step 4: Call LLM ---
-        summary = run_instruction(summary_instruction, f"Transcript:\n{formatted_transcript}")
+        with stage("llm:Summary"):
+            summary = await run_instruction_async(summary_instruction, f"{transcript_label}:\n{transcript_text}")
         # suggestion = run_instruction(suggestion_instruction, f"Transcript:\n{formatted_transcript}")
         instructions = {
             "Meeting Details": "Extract the meeting date (if available), time, participants, organizer, and duration.",
@@ -451,14 +536,15 @@ async def handle_finalize_post_processing(meetingId: str, userId: str, transcrip
         results = {}
         for section, instruction in instructions.items():
 
-          if section == "Action Items / To-Dos":
-           # Simulate extracted markdown table text (you can replace this with actual content from base_context)
-           table_text = run_instruction(instruction, base_context)
-           action_items = extract_calendly_events(table_text)
-           await calendar_events_tasks_collection_save(meetingId, eventId, userId, action_items)
-           results[section] = table_text
-          else:
-            results[section] = run_instruction(instruction, base_context)
+          with stage(f"llm:{section}"):
+            if section == "Action Items / To-Dos":
+             # Simulate extracted markdown table text (you can replace this with actual content from base_context)
+             table_text = await run_instruction_async(instruction, base_context, share_context=True)
+             action_items = extract_calendly_events(table_text)
+             await calendar_events_tasks_collection_save(meetingId, eventId, userId, action_items)
+             results[section] = table_text
+            else:
+              results[section] = await run_instruction_async(instruction, base_context, share_context=True)
 
 
         # print(f"📄 Summary:\n{summary}\n\n💡 Suggestions:\n{suggestion}")
@@ -469,9 +555,14 @@ async def handle_finalize_post_processing(meetingId: str, userId: str, transcrip
         await update_calendar_event(eventId, {
             "status": "completed",
         })
+        await store_trace(trace)
 
     except Exception as e:
         print(f"❌ Error in finalize post-processing: {e}")
+        await store_trace(trace, error=str(e))
+    finally:
+        # Closes the trace when the task was cancelled; a no-op once stored
+        await store_trace(trace, error="interrupted")
 
 
 @router.post("/meetings", response_model=MeetingResponse)
@@ -661,43 +752,44 @@ async def process_finalize_session(
     """
     Background process for finalizing session.
     """
-    temp_dir = tempfile.mkdtemp()
-    final_path = None
-    sample_path = None
-    
+    trace = start_trace("finalize_online", meetingId, eventId=eventId, userId=userId)
     try:
         # Read the audio file
-        audio_bytes = await file.read()
-        
-        # Save the audio file to temp directory
-        final_path = os.path.join(temp_dir, f"{meetingId}_{file.filename}")
-        with open(final_path, "wb") as f:
-            f.write(audio_bytes)
+        with stage("read_upload") as span:
+            audio_bytes = await file.read()
+            span["bytes"] = len(audio_bytes)
         
         # Upload the audio file to S3
         s3_key = f"final_recording/{meetingId}/{containerId}/{file.filename}"
-        s3_url = upload_file_to_s3(s3_key, audio_bytes)
-
-        # Fetch salesperson sample from DB
-        sample_url = await get_salesperson_sample(userId)
-        s3_sample_key = extract_filename_from_s3_url(sample_url["s3_url"]) 
-        
-        # Download and save salesperson sample locally
-        sample_path = os.path.join(temp_dir, os.path.basename(s3_sample_key))
-
-        sample_file_data = download_file_from_s3(s3_sample_key)
-        with open(sample_path, "wb") as sf:
-            sf.write(sample_file_data)
-
-        # Load reference embedding from local sample file
-        ref_embedding = load_reference_embedding(sample_path)
-
-        # Run diarization and process
-        diarization = run_diarization(final_path)
-        results = process_segments(diarization, final_path, ref_embedding)
+        with stage("s3_upload"):
+            s3_url = await asyncio.to_thread(upload_file_to_s3, s3_key, audio_bytes)
+
+        # Normalise to 16 kHz mono once and store the canonical artifact
+        with stage("ingest") as span:
+            audio, canonical_wav = await run_in_ml_pool("audio", ingest_audio_bytes, audio_bytes)
+            span["audioSeconds"] = duration_seconds(audio)
+        trace.attributes["audioSeconds"] = round(duration_seconds(audio), 2)
+        with stage("s3_upload_canonical"):
+            canonical_url = await asyncio.to_thread(
+                upload_file_to_s3, f"final_recording/{meetingId}/{containerId}/canonical.wav", canonical_wav
+            )
+
+        # Enrolled reference embeddings of the organization's reps (computed at upload time)
+        with stage("reference_embeddings"):
+            meeting = await get_meeting_by_id(meetingId) or {}
+            ref_embedding = await get_salesperson_matcher(userId, meeting.get("organizationId"))
+
+        # Run VAD, diarization and transcription on the ingested samples
+        with stage("transcribe_recording", audio_seconds=duration_seconds(audio)):
+            results = await transcribe_recording(audio, ref_embedding, meeting_id=meetingId)
+
+        # The final transcript supersedes the live one
+        finish_stream(meetingId, flush=False)
 
         # Save the final audio metadata
-        await save_final_audio(meetingId, s3_url, results, userId)
+        with stage("save_results"):
+            await save_final_audio(meetingId, s3_url, results, userId, canonical_url=canonical_url)
+        await store_trace(trace)
         
         # Run post-processing in background
         asyncio.create_task(handle_finalize_post_processing(meetingId, userId, results, eventId))
@@ -712,14 +804,10 @@ async def process_finalize_session(
             
     except Exception as e:
         print(f"Error in background processing: {str(e)}")
+        await store_trace(trace, error=str(e))
     finally:
-        # Clean up temporary files
-        if final_path and os.path.exists(final_path):
-            os.remove(final_path)
-        if sample_path and os.path.exists(sample_path):
-            os.remove(sample_path)
-        if os.path.exists(temp_dir):
-            os.rmdir(temp_dir)
+        # Closes the trace when the task was cancelled; a no-op once stored
+        await store_trace(trace, error="interrupted")
 
 @router.post("/update-meeting-status")
 async def update_meeting_status(
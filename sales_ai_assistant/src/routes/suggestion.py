@@ -1,10 +1,12 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Body, Query, Depends
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Body, Query, Depends, Request
 from typing import List,Dict
 from bson import ObjectId
 from src.services.mongo_service import (get_final_audio, 
 get_real_time_transcript, get_summary_and_suggestion, save_suggestion, get_suggestions_by_user_and_session,get_googlemeeting_by_id, update_calendar_event,get_meeting_by_id,extract_number)
 from src.routes.auth import verify_token
-from src.services.prediction_models_service import run_instruction
+from src.services.prediction_models_service import run_instruction_async
+from src.services.transcript_summarizer import fit_transcript
+from src.services.token_budget import content_budget
 from src.services.mongo_service import get_meeting_by_id
 from src.services.mongo_service import meetings_collection
 
@@ -59,7 +61,7 @@ from typing import List
 
 
 @router.get("/meeting-summary-from-transcript", response_model=dict)
-async def generate_summary_from_transcript(meetingId: str, userId: str):
+async def generate_summary_from_transcript(meetingId: str, userId: str, request: Request, refresh: bool = False):
     # 1. Get meeting from DB
     meeting = await get_googlemeeting_by_id(meetingId)
     if not meeting or meeting.get("user_id") != userId:
@@ -73,10 +75,17 @@ async def generate_summary_from_transcript(meetingId: str, userId: str):
     full_text = "\n".join([item["text"] for item in transcript if item.get("text")])
 
     # 3. Run LLM to generate summary, suggestion, risk score, next step
-    summary = run_instruction("Summarize the meeting in 5 lines", full_text)
-    suggestion = run_instruction("What is the business suggestion from this meeting?", full_text)
-    risk_score_text = run_instruction("Give a risk score (0-100) for this deal based on the summary", f"Summary:\n{summary}")
-    next_step = run_instruction("Mention the next step or action item based on the meeting discussion", full_text)
+    try:
+        # refresh=true regenerates instead of returning cached answers
+        use_cache = not refresh
+        # Long meetings are condensed into notes that fit the LLM context
+        full_text, _ = await fit_transcript(full_text, content_budget(300), request=request, use_cache=use_cache)
+        summary = await run_instruction_async("Summarize the meeting in 5 lines", full_text, request=request, share_context=True, use_cache=use_cache)
+        suggestion = await run_instruction_async("What is the business suggestion from this meeting?", full_text, request=request, share_context=True, use_cache=use_cache)
+        risk_score_text = await run_instruction_async("Give a risk score (0-100) for this deal based on the summary", f"Summary:\n{summary}", request=request, use_cache=use_cache)
+        next_step = await run_instruction_async("Mention the next step or action item based on the meeting discussion", full_text, request=request, share_context=True, use_cache=use_cache)
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     # Extract numeric risk score
     risk_score = extract_number(risk_score_text)
     # 4. Save all results to DB
@@ -268,6 +277,7 @@ async def get_questions_answers_llm(
     meetingId: str,
     eventId: str,
     userId:str,
+    request: Request,
     # token_data: dict = Depends(verify_token)
 ):
     # userId = token_data["user_id"]
@@ -293,12 +303,14 @@ async def get_questions_answers_llm(
     )
 
     try:
-        output_text = run_instruction(task, full_conversation, max_tokens=600)
+        output_text = await run_instruction_async(task, full_conversation, max_tokens=600, request=request)
 
         # 3. Parse JSON string
         qa_pairs = json.loads(output_text)
         return qa_pairs
 
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         print(f"Error from LLM or JSON parse: {e}")
         raise HTTPException(status_code=500, detail="LLM processing failed")
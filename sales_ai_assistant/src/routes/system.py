@@ -0,0 +1,53 @@
+from typing import Optional
+from fastapi import APIRouter
+from src.services.model_registry import resident_models
+from src.services.metrics_service import recent_traces, stage_summary
+from src.services.batched_transcription_service import batching_stats
+from src.services.llm_service import llm_stats
+from src.services.llm_response_cache import response_cache_stats
+from src.services.mongo_service import get_pipeline_metrics
+
+router = APIRouter()
+
+
+@router.get("/models")
+async def get_resident_models():
+    """
+    List the ML models currently loaded in this worker process.
+
+    Returns:
+        dict: Resident models with load time and memory added at load,
+              all registered model names and the process RSS in bytes
+    """
+    return resident_models()
+
+
+@router.get("/metrics")
+async def get_pipeline_metrics_summary(limit: Optional[int] = 20):
+    """
+    Per-stage timings of the pipeline runs recently handled by this worker process.
+
+    Args:
+        limit (int): Number of recent runs to return in full
+
+    Returns:
+        dict: Per-stage totals (count, wall time, mean real-time factor), batched
+              Whisper statistics, LLM queue and answer cache statistics and the
+              most recent runs with their spans
+    """
+    return {"stages": stage_summary(), "asrBatching": batching_stats(), "llm": llm_stats(),
+            "llmCache": response_cache_stats(), "recent": recent_traces(limit)}
+
+
+@router.get("/metrics/{meetingId}")
+async def get_meeting_pipeline_metrics(meetingId: str):
+    """
+    Stored pipeline runs of a meeting, newest first.
+
+    Args:
+        meetingId (str): ID of the meeting
+
+    Returns:
+        dict: The meeting's runs with wall time, CPU time, peak RSS and spans
+    """
+    return {"meetingId": meetingId, "runs": await get_pipeline_metrics(meetingId)}
@@ -0,0 +1,97 @@
+import io
+import subprocess
+from functools import lru_cache
+import numpy as np
+import soundfile as sf
+import torch
+import torchaudio
+
+# In-memory audio decoding shared by the transcription, diarization and speaker
+# embedding stages: uploaded bytes are turned into a mono float32 PCM array once
+# and that array is handed to every model, instead of round-tripping through
+# temp files.
+#
+# Uploads are normalised once to the canonical ingest format (16 kHz mono 16-bit
+# PCM WAV). That artifact is what gets stored, so later stages read it without
+# decoding a compressed format or resampling again.
+
+SAMPLE_RATE = 16000
+CANONICAL_SUBTYPE = "PCM_16"
+
+
+@lru_cache(maxsize=16)
+def get_resampler(orig_sr: int, new_sr: int = SAMPLE_RATE) -> torchaudio.transforms.Resample:
+    """Shared Resample transform per (src, dst) rate pair; its filter kernel is built once."""
+    return torchaudio.transforms.Resample(orig_freq=orig_sr, new_freq=new_sr)
+
+
+def resample(samples: np.ndarray, orig_sr: int, new_sr: int = SAMPLE_RATE) -> np.ndarray:
+    if orig_sr == new_sr:
+        return samples
+    with torch.no_grad():
+        return get_resampler(orig_sr, new_sr)(torch.from_numpy(np.ascontiguousarray(samples))).numpy()
+
+
+def _decode_with_soundfile(audio_bytes: bytes, sample_rate: int) -> np.ndarray:
+    data, sr = sf.read(io.BytesIO(audio_bytes), dtype="float32", always_2d=True)
+    return resample(data.mean(axis=1), sr, sample_rate)
+
+
+def _decode_with_ffmpeg(audio_bytes: bytes, sample_rate: int) -> np.ndarray:
+    # Formats libsndfile cannot read (webm/opus from browsers, mp4, ...) go
+    # through an ffmpeg pipe: encoded bytes on stdin, raw float32 PCM on stdout.
+    process = subprocess.run(
+        [
+            "ffmpeg", "-nostdin", "-loglevel", "error",
+            "-i", "pipe:0",
+            "-f", "f32le", "-ac", "1", "-ar", str(sample_rate),
+            "pipe:1",
+        ],
+        input=audio_bytes,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    if process.returncode != 0:
+        raise ValueError(f"Could not decode audio: {process.stderr.decode(errors='ignore').strip()}")
+    return np.frombuffer(process.stdout, dtype=np.float32).copy()
+
+
+def decode_audio_bytes(audio_bytes: bytes, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Decode encoded audio bytes into a mono float32 array at `sample_rate`."""
+    try:
+        return _decode_with_soundfile(audio_bytes, sample_rate)
+    except (RuntimeError, TypeError):
+        return _decode_with_ffmpeg(audio_bytes, sample_rate)
+
+
+def is_canonical(audio_bytes: bytes) -> bool:
+    """True when the bytes already are a 16 kHz mono 16-bit PCM WAV."""
+    try:
+        info = sf.info(io.BytesIO(audio_bytes))
+    except (RuntimeError, TypeError):
+        return False
+    return (info.format == "WAV" and info.samplerate == SAMPLE_RATE
+            and info.channels == 1 and info.subtype == CANONICAL_SUBTYPE)
+
+
+def encode_canonical_wav(samples: np.ndarray) -> bytes:
+    """Encode 16 kHz mono float samples as a 16-bit PCM WAV."""
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, SAMPLE_RATE, subtype=CANONICAL_SUBTYPE, format="WAV")
+    return buffer.getvalue()
+
+
+def ingest_audio_bytes(audio_bytes: bytes):
+    """
+    Normalise an upload to the canonical ingest format.
+
+    Returns (samples, canonical_wav): the mono 16 kHz float32 array for the models
+    and the WAV bytes to store. Canonical input is passed through untouched.
+    """
+    samples = decode_audio_bytes(audio_bytes)
+    canonical_wav = audio_bytes if is_canonical(audio_bytes) else encode_canonical_wav(samples)
+    return samples, canonical_wav
+
+
+def duration_seconds(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> float:
+    return len(samples) / sample_rate
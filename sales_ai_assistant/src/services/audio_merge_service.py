@@ -1,7 +1,64 @@
-from pydub import AudioSegment
+import os
+import subprocess
+import tempfile
+import wave
 
-def merge_audio_chunks(file_paths: list, output_path: str):
-    combined = AudioSegment.empty()
-    for path in file_paths:
-        combined += AudioSegment.from_file(path)
-    combined.export(output_path, format="wav")
+# Chunks are decoded one at a time by ffmpeg, normalised to a common sample rate
+# and channel count, and their PCM is streamed straight into a single WAV file.
+# Memory use is bounded by READ_BLOCK_BYTES regardless of the meeting length.
+MERGE_SAMPLE_RATE = 16000
+MERGE_CHANNELS = 1
+SAMPLE_WIDTH = 2  # 16-bit PCM
+READ_BLOCK_BYTES = 1 << 16
+
+
+def _stream_pcm(path: str, output: wave.Wave_write, sample_rate: int, channels: int):
+    # stderr goes to a file: a pipe nobody reads while stdout is drained can
+    # fill up and block ffmpeg
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(
+            [
+                "ffmpeg", "-nostdin", "-loglevel", "error",
+                "-i", path,
+                "-f", "s16le", "-acodec", "pcm_s16le",
+                "-ac", str(channels), "-ar", str(sample_rate),
+                "pipe:1",
+            ],
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+        )
+        try:
+            while True:
+                block = process.stdout.read(READ_BLOCK_BYTES)
+                if not block:
+                    break
+                output.writeframesraw(block)
+        except BaseException:
+            process.kill()
+            raise
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+        if returncode != 0:
+            stderr.seek(0)
+            raise ValueError(f"Could not decode {path}: {stderr.read().decode(errors='ignore').strip()}")
+
+
+def merge_audio_chunks(file_paths: list, output_path: str, sample_rate: int = MERGE_SAMPLE_RATE, channels: int = MERGE_CHANNELS):
+    """
+    Concatenate audio chunks of any format into one PCM WAV at `sample_rate`/`channels`.
+
+    If a chunk cannot be decoded, the partial output file is removed and the error raised.
+    """
+    try:
+        with wave.open(output_path, "wb") as output:
+            output.setnchannels(channels)
+            output.setsampwidth(SAMPLE_WIDTH)
+            output.setframerate(sample_rate)
+            for path in file_paths:
+                _stream_pcm(path, output, sample_rate, channels)
+        # wave patches the RIFF/data sizes in the header on close
+    except BaseException:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
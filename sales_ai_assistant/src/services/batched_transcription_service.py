@@ -0,0 +1,204 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+
+from src.services.model_registry import get_model
+from src.services.decoding_profiles import DECODING_PROFILES, get_meeting_language, remember_language
+
+# Batched Whisper decoding for many short items (live chunks from concurrent
+# meetings, diarization turns). Callers submit audio and get a Future; one worker
+# thread per model collects up to WHISPER_BATCH_SIZE items, waiting at most
+# WHISPER_BATCH_MAX_WAIT_MS after the first one, pads them to Whisper's 30 s
+# window and runs a single encoder pass and a single generate call for the batch.
+# Under load batches fill up and throughput per core rises; an idle server adds
+# at most the wait window to a request.
+#
+# There is one transcriber per model and decoding profile; the profile's beam
+# size applies. Items are decoded independently at temperature 0, so temperature
+# fallback and conditioning on previous text do not apply. Items of a meeting
+# with a pinned language skip detection, and a confident detection pins it.
+
+WHISPER_BATCH_ENABLED = os.getenv("WHISPER_BATCH_ENABLED", "true").lower() in ("1", "true", "yes")
+WHISPER_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "8"))
+WHISPER_BATCH_MAX_WAIT_MS = float(os.getenv("WHISPER_BATCH_MAX_WAIT_MS", "50"))
+SAMPLE_RATE = 16000
+WINDOW_SECONDS = 30  # Whisper's input window; longer items are split
+
+
+def split_window(audio: np.ndarray) -> list:
+    step = WINDOW_SECONDS * SAMPLE_RATE
+    return [audio[offset:offset + step] for offset in range(0, max(len(audio), 1), step)]
+
+
+def decode_batch(model, audios: list, languages: list, beam_size: int = 5) -> list:
+    """
+    Transcribe up to 30 s items with one encoder pass and one generate call.
+
+    `model` is a faster-whisper WhisperModel. Items without a language get the one
+    detected from their own encoder output. Returns (text, language, probability)
+    per item; the probability is 1.0 for languages that were given.
+    """
+    from faster_whisper.tokenizer import Tokenizer
+
+    extractor = model.feature_extractor
+    features = []
+    for audio in audios:
+        feature = extractor(audio)[:, :extractor.nb_max_frames]
+        pad = extractor.nb_max_frames - feature.shape[-1]
+        features.append(np.pad(feature, ((0, 0), (0, pad))) if pad > 0 else feature)
+    encoder_output = model.encode(np.stack(features).astype(np.float32))
+
+    languages = list(languages)
+    probabilities = [1.0] * len(languages)
+    if not model.model.is_multilingual:
+        languages = ["en" if language is None else language for language in languages]
+    elif any(language is None for language in languages):
+        detected = model.model.detect_language(encoder_output)
+        for i, language in enumerate(languages):
+            if language is None:
+                token, probabilities[i] = detected[i][0]
+                languages[i] = token[2:-2]  # "<|en|>" -> "en"
+
+    prompts = []
+    tokenizers = []
+    for language in languages:
+        tokenizer = Tokenizer(model.hf_tokenizer, model.model.is_multilingual, task="transcribe", language=language)
+        tokenizers.append(tokenizer)
+        prompts.append(model.get_prompt(tokenizer, previous_tokens=[], without_timestamps=True))
+
+    results = model.model.generate(
+        encoder_output,
+        prompts,
+        beam_size=beam_size,
+        max_length=model.max_length,
+        suppress_blank=True,
+        suppress_tokens=[-1],
+    )
+    return [
+        (tokenizer.decode(result.sequences_ids[0]).strip(), language, probability)
+        for tokenizer, result, language, probability in zip(tokenizers, results, languages, probabilities)
+    ]
+
+
+class BatchedTranscriber:
+    def __init__(self, model_name: str, profile: str = "live", batch_size: int = WHISPER_BATCH_SIZE,
+                 max_wait_ms: float = WHISPER_BATCH_MAX_WAIT_MS):
+        self.model_name = model_name
+        self.profile = profile
+        self.beam_size = DECODING_PROFILES[profile]["beam_size"]
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        self.stats = {"batches": 0, "items": 0, "decodeSeconds": 0.0}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name=f"asr-batch-{self.model_name}-{self.profile}", daemon=True)
+                self._thread.start()
+
+    def submit(self, audio: np.ndarray, language: str = None, meeting_id: str = None) -> Future:
+        """
+        Queue one item of at most 30 s; the Future resolves to (text, language, probability).
+
+        Without `language`, the meeting's pinned language is used if there is one.
+        """
+        future = Future()
+        self._ensure_worker()
+        language = language or get_meeting_language(meeting_id)
+        self.queue.put((np.asarray(audio, dtype=np.float32), language, meeting_id, future))
+        return future
+
+    def _submit_all(self, audio: np.ndarray, language: str = None, meeting_id: str = None) -> list:
+        return [self.submit(piece, language, meeting_id) for piece in split_window(audio)]
+
+    def transcribe(self, audio: np.ndarray, language: str = None, meeting_id: str = None) -> str:
+        """Blocking transcription of any length; items over 30 s are split and rejoined."""
+        futures = self._submit_all(audio, language, meeting_id)
+        return " ".join(result[0] for result in (future.result() for future in futures) if result[0])
+
+    def transcribe_many(self, audios: list, language: str = None, meeting_id: str = None) -> list:
+        """Submit every item at once so they share batches; returns one text per item."""
+        pending = [self._submit_all(audio, language, meeting_id) for audio in audios]
+        return [
+            " ".join(result[0] for result in (future.result() for future in futures) if result[0])
+            for futures in pending
+        ]
+
+    async def transcribe_async(self, audio: np.ndarray, language: str = None, meeting_id: str = None) -> str:
+        futures = self._submit_all(audio, language, meeting_id)
+        results = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+        return " ".join(result[0] for result in results if result[0])
+
+    def _collect(self) -> list:
+        items = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                items.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _loop(self):
+        while True:
+            items = self._collect()
+            items = [item for item in items if item[3].set_running_or_notify_cancel()]
+            if not items:
+                continue
+            started = time.perf_counter()
+            try:
+                model = get_model(self.model_name)
+                # Models may provide their own batched decode (the benchmark stubs do)
+                decode = getattr(model, "decode_batch", None) or (
+                    lambda audios, languages: decode_batch(model, audios, languages, beam_size=self.beam_size)
+                )
+                results = decode([item[0] for item in items], [item[1] for item in items])
+            except Exception as e:
+                print(f"[ASR-BATCH] Batch of {len(items)} failed: {e}")
+                for item in items:
+                    item[3].set_exception(e)
+                continue
+
+            elapsed = time.perf_counter() - started
+            self.stats["batches"] += 1
+            self.stats["items"] += len(items)
+            self.stats["decodeSeconds"] += elapsed
+            print(f"[ASR-BATCH] {self.model_name}: {len(items)} item(s) in {elapsed:.2f}s")
+            for (_, language, meeting_id, future), result in zip(items, results):
+                if language is None:
+                    remember_language(meeting_id, result[1], result[2])
+                future.set_result(result)
+
+
+_transcribers = {}
+_transcribers_lock = threading.Lock()
+
+
+def get_batched_transcriber(model_name: str, profile: str = "live") -> BatchedTranscriber:
+    with _transcribers_lock:
+        key = (model_name, profile)
+        if key not in _transcribers:
+            _transcribers[key] = BatchedTranscriber(model_name, profile)
+        return _transcribers[key]
+
+
+def batching_stats() -> dict:
+    """Batches run and mean batch size per model, for the metrics endpoint."""
+    stats = {}
+    with _transcribers_lock:
+        for (name, profile), transcriber in _transcribers.items():
+            batches = transcriber.stats["batches"]
+            stats[f"{name}:{profile}"] = {
+                **transcriber.stats,
+                "decodeSeconds": round(transcriber.stats["decodeSeconds"], 3),
+                "meanBatchSize": round(transcriber.stats["items"] / batches, 2) if batches else None,
+            }
+    return stats
@@ -0,0 +1,69 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+# Whisper decoding options per pipeline, and the language of each meeting.
+#
+# "live" favours latency: greedy decoding, no temperature fallback, no
+# conditioning on earlier text. "final" favours accuracy with the Whisper
+# defaults. Each option can be overridden with LIVE_* / FINAL_* variables.
+#
+# Once a chunk of a meeting is detected with at least LANGUAGE_CONFIDENCE, the
+# language is pinned for the rest of the meeting and passed to every later
+# decode, which skips language detection.
+
+TEMPERATURE_FALLBACK = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+LANGUAGE_CONFIDENCE = float(os.getenv("LANGUAGE_CONFIDENCE", "0.7"))
+# Meetings whose language is kept in memory, least recently used dropped first
+LANGUAGE_CACHE_SIZE = int(os.getenv("LANGUAGE_CACHE_SIZE", "1000"))
+
+
+def _flag(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
+
+
+def _profile(prefix: str, beam_size: int, temperature_fallback: bool, condition_on_previous_text: bool) -> dict:
+    return {
+        "beam_size": int(os.getenv(f"{prefix}_BEAM_SIZE", str(beam_size))),
+        "temperature": TEMPERATURE_FALLBACK if _flag(f"{prefix}_TEMPERATURE_FALLBACK", temperature_fallback) else 0.0,
+        "condition_on_previous_text": _flag(f"{prefix}_CONDITION_ON_PREVIOUS_TEXT", condition_on_previous_text),
+    }
+
+
+DECODING_PROFILES = {
+    "live": _profile("LIVE", beam_size=1, temperature_fallback=False, condition_on_previous_text=False),
+    "final": _profile("FINAL", beam_size=5, temperature_fallback=True, condition_on_previous_text=True),
+}
+
+_languages = OrderedDict()
+_languages_lock = threading.Lock()
+
+
+def get_meeting_language(meeting_id: Optional[str]) -> Optional[str]:
+    if not meeting_id:
+        return None
+    with _languages_lock:
+        language = _languages.get(meeting_id)
+        if language is not None:
+            _languages.move_to_end(meeting_id)
+        return language
+
+
+def remember_language(meeting_id: Optional[str], language: Optional[str], probability: float) -> bool:
+    """Pin `language` for the meeting if detected confidently and none is pinned yet."""
+    if not meeting_id or not language or probability < LANGUAGE_CONFIDENCE:
+        return False
+    with _languages_lock:
+        if meeting_id in _languages:
+            return False
+        _languages[meeting_id] = language
+        while len(_languages) > LANGUAGE_CACHE_SIZE:
+            _languages.popitem(last=False)
+    print(f"[DECODE] {meeting_id}: language pinned to {language} ({probability:.2f})")
+    return True
+
+
+def decoding_options(profile: str, meeting_id: Optional[str] = None) -> dict:
+    """Keyword arguments for model.transcribe: the profile plus the meeting's pinned language."""
+    return {**DECODING_PROFILES[profile], "language": get_meeting_language(meeting_id)}
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone
+from typing import Optional
+
+from src.services.model_registry import LLM_MODEL_PATH
+from src.services.mongo_service import get_llm_response, save_llm_response, ensure_llm_response_ttl
+
+# Cache of LLM answers. Keys hash the prompt, the model file and the sampling
+# parameters, so an identical request (a refreshed summary, a re-posted chat-bot
+# report, a repeated email) is answered without running the model. Answers are
+# kept in an in-process LRU of LLM_CACHE_SIZE entries and in Mongo, where a TTL
+# index drops them after LLM_CACHE_TTL_SECONDS; a memory miss falls back to Mongo
+# and refills the LRU. Mongo errors are logged and treated as misses.
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Bump when a prompt or post-processing change alters answers for the same input
+PROMPT_VERSION = "1"
+
+_entries = OrderedDict()
+_lock = threading.Lock()
+_model_fingerprint = None
+cache_stats = {"memoryHits": 0, "mongoHits": 0, "misses": 0, "bypassed": 0, "stores": 0, "errors": 0}
+
+
+def model_fingerprint() -> str:
+    """Model file name and size, so replacing the weights invalidates every entry."""
+    global _model_fingerprint
+    if _model_fingerprint is None:
+        try:
+            size = os.path.getsize(LLM_MODEL_PATH)
+        except OSError:
+            size = None
+        _model_fingerprint = f"{os.path.basename(LLM_MODEL_PATH)}:{size}"
+    return _model_fingerprint
+
+
+def response_key(prompt, **params) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(json.dumps([PROMPT_VERSION, model_fingerprint(), prompt, params], sort_keys=True,
+                             default=str).encode())
+    return digest.hexdigest()
+
+
+def get_local(key: str) -> Optional[str]:
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return None
+        stored, response = entry
+        if time.time() - stored > LLM_CACHE_TTL_SECONDS:
+            del _entries[key]
+            return None
+        _entries.move_to_end(key)
+        return response
+
+
+def put_local(key: str, response: str, stored: float = None):
+    with _lock:
+        _entries[key] = (stored or time.time(), response)
+        _entries.move_to_end(key)
+        while len(_entries) > LLM_CACHE_SIZE:
+            _entries.popitem(last=False)
+
+
+async def get_response(key: str) -> Optional[str]:
+    if not LLM_CACHE_ENABLED:
+        return None
+    response = get_local(key)
+    if response is not None:
+        cache_stats["memoryHits"] += 1
+        return response
+    try:
+        doc = await get_llm_response(key)
+    except Exception as e:
+        print(f"[LLM-CACHE] Lookup failed: {e}")
+        cache_stats["errors"] += 1
+        doc = None
+    if doc is None:
+        cache_stats["misses"] += 1
+        return None
+    cache_stats["mongoHits"] += 1
+    created = doc.get("createdAt")
+    put_local(key, doc["response"], created.replace(tzinfo=timezone.utc).timestamp() if created else None)
+    return doc["response"]
+
+
+async def put_response(key: str, response: str):
+    if not LLM_CACHE_ENABLED:
+        return
+    put_local(key, response)
+    cache_stats["stores"] += 1
+    try:
+        await save_llm_response(key, response, model_fingerprint())
+    except Exception as e:
+        print(f"[LLM-CACHE] Store failed: {e}")
+        cache_stats["errors"] += 1
+
+
+async def ensure_ttl_index():
+    try:
+        await ensure_llm_response_ttl(LLM_CACHE_TTL_SECONDS)
+    except Exception as e:
+        print(f"[LLM-CACHE] Could not set up the TTL index: {e}")
+
+
+def response_cache_stats() -> dict:
+    lookups = cache_stats["memoryHits"] + cache_stats["mongoHits"] + cache_stats["misses"]
+    hits = cache_stats["memoryHits"] + cache_stats["mongoHits"]
+    return {
+        **cache_stats,
+        "hitRate": round(hits / lookups, 3) if lookups else None,
+        "entries": len(_entries),
+    }
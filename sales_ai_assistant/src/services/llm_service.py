@@ -0,0 +1,254 @@
+import asyncio
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from src.services.model_registry import get_model
+
+# Queued execution of llama.cpp calls. A Llama instance is not thread safe and
+# one generation already uses all of its n_threads, so every call goes through a
+# single inference thread per model that takes jobs from a queue. Interactive
+# jobs (routes waiting on the answer) run before background ones, each priority
+# in submission order, and a background job can name a `latest_key` so that only
+# the newest job for it stays queued (live suggestions of a growing transcript).
+# Callers get a Future; async callers await it with a timeout and, given the
+# incoming request, stop waiting when the client disconnects. A job that is given
+# up on is cancelled: a queued job is skipped, a running one stops generating at
+# the next token.
+#
+# Prompts that share a long prefix (several instructions over one transcript)
+# can reuse its evaluation: the llama.cpp state after the prefix is saved once
+# and restored for each prompt, so only the instruction is evaluated. A saved
+# state holds the prefix's KV cache and logits, hundreds of MB for a long
+# transcript, so only LLM_PREFIX_CACHE_SIZE of them are kept.
+
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "600"))
+# How often a waiting caller checks whether its client is still connected
+LLM_DISCONNECT_POLL_SECONDS = float(os.getenv("LLM_DISCONNECT_POLL_SECONDS", "1.0"))
+LLM_PREFIX_CACHE_SIZE = int(os.getenv("LLM_PREFIX_CACHE_SIZE", "1"))
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+
+class LLMRequestCancelled(Exception):
+    pass
+
+
+class LLMFuture(Future):
+    """Future whose cancel() also stops the job if it is already running."""
+
+    def __init__(self):
+        super().__init__()
+        self.cancel_event = threading.Event()
+
+    def cancel(self) -> bool:
+        self.cancel_event.set()
+        return super().cancel()
+
+
+def complete(llm, cancelled: threading.Event, prompt, **kwargs) -> dict:
+    """llama.cpp completion that ends early once `cancelled` is set."""
+    from llama_cpp import StoppingCriteriaList
+    criteria = StoppingCriteriaList([lambda input_ids, logits: cancelled.is_set()])
+    return llm(prompt, stopping_criteria=criteria, **kwargs)
+
+
+_prefix_states = OrderedDict()
+_prefix_lock = threading.Lock()
+prefix_stats = {"resident": 0, "restored": 0, "evaluated": 0, "tokensReused": 0}
+
+
+def restore_prefix(llm, tokens: list):
+    """
+    Leave `llm` with exactly the state after `tokens` evaluated, or a longer state
+    starting with them; llama.cpp then only evaluates what follows.
+    """
+    if LLM_PREFIX_CACHE_SIZE <= 0:
+        return
+    if llm.n_tokens >= len(tokens) and llm.input_ids[:len(tokens)].tolist() == tokens:
+        # Still in the context from the previous prompt
+        prefix_stats["resident"] += 1
+        prefix_stats["tokensReused"] += len(tokens)
+        return
+
+    key = (id(llm), tuple(tokens))
+    with _prefix_lock:
+        state = _prefix_states.get(key)
+        if state is not None:
+            _prefix_states.move_to_end(key)
+    if state is not None:
+        llm.load_state(state)
+        prefix_stats["restored"] += 1
+        prefix_stats["tokensReused"] += len(tokens)
+        return
+
+    started = time.perf_counter()
+    llm.reset()
+    llm.eval(tokens)
+    state = llm.save_state()
+    with _prefix_lock:
+        _prefix_states[key] = state
+        while len(_prefix_states) > LLM_PREFIX_CACHE_SIZE:
+            _prefix_states.popitem(last=False)
+    prefix_stats["evaluated"] += 1
+    print(f"[LLM] Evaluated and saved a {len(tokens)}-token prefix in {time.perf_counter() - started:.2f}s")
+
+
+def complete_with_prefix(llm, cancelled: threading.Event, prefix: str, suffix: str, cache_prefix: bool = False,
+                         **kwargs) -> dict:
+    """
+    complete() on prefix + suffix, tokenized separately so the prefix tokens are
+    the same for every suffix.
+
+    With `cache_prefix` the state after the prefix is saved and restored (see
+    restore_prefix). Without it llama.cpp still skips the leading tokens the
+    previous prompt had in common with this one.
+    """
+    prefix_tokens = llm.tokenize(prefix.encode("utf-8"), add_bos=True, special=True)
+    suffix_tokens = llm.tokenize(suffix.encode("utf-8"), add_bos=False, special=True)
+    if cache_prefix:
+        restore_prefix(llm, prefix_tokens)
+    return complete(llm, cancelled, prefix_tokens + suffix_tokens, **kwargs)
+
+
+class LLMService:
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.queue = queue.PriorityQueue()
+        self.stats = {"jobs": 0, "failed": 0, "skipped": 0, "superseded": 0, "stopped": 0, "timeouts": 0,
+                      "disconnects": 0, "busySeconds": 0.0, "waitSeconds": 0.0}
+        self._thread = None
+        self._lock = threading.Lock()
+        self._order = itertools.count()
+        self._latest = {}
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name=f"llm-{self.model_name}", daemon=True)
+                self._thread.start()
+
+    def submit(self, fn, *args, priority: int = PRIORITY_INTERACTIVE, latest_key: str = None, **kwargs) -> LLMFuture:
+        """
+        Queue fn(llm, cancelled, *args, **kwargs) for the inference thread.
+
+        `cancelled` is a threading.Event set when the caller gives up; long-running
+        jobs should check it (see complete()). A job with a `latest_key` replaces
+        the job of the same key still waiting in the queue, which is cancelled.
+        """
+        future = LLMFuture()
+        self._ensure_worker()
+        if latest_key is not None:
+            with self._lock:
+                previous = self._latest.get(latest_key)
+                self._latest[latest_key] = future
+            if previous is not None and not previous.running() and previous.cancel():
+                self.stats["superseded"] += 1
+        self.queue.put((priority, next(self._order), fn, args, kwargs, future, time.perf_counter(), latest_key))
+        return future
+
+    def call(self, fn, *args, timeout: float = None, **kwargs):
+        """Blocking submit(); cancels the job if it does not finish within `timeout`."""
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=LLM_TIMEOUT_SECONDS if timeout is None else timeout)
+        except TimeoutError:
+            future.cancel()
+            self.stats["timeouts"] += 1
+            raise
+
+    async def call_async(self, fn, *args, timeout: float = None, request=None, priority: int = PRIORITY_INTERACTIVE,
+                         latest_key: str = None, **kwargs):
+        """
+        Await a job without blocking the event loop.
+
+        Raises TimeoutError after `timeout` seconds and LLMRequestCancelled once
+        `request` (a Starlette Request) reports its client disconnected; in both
+        cases, and when the awaiting task is cancelled, the job is cancelled too.
+        LLMRequestCancelled is also raised when a newer job with the same
+        `latest_key` replaced this one.
+        """
+        future = self.submit(fn, *args, priority=priority, latest_key=latest_key, **kwargs)
+        waiter = asyncio.wrap_future(future)
+        limit = LLM_TIMEOUT_SECONDS if timeout is None else timeout
+        deadline = time.monotonic() + limit
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats["timeouts"] += 1
+                    raise TimeoutError(f"LLM call did not finish within {limit:g}s")
+                wait = min(remaining, LLM_DISCONNECT_POLL_SECONDS) if request is not None else remaining
+                done, _ = await asyncio.wait({waiter}, timeout=wait)
+                if done:
+                    if future.cancelled():
+                        raise LLMRequestCancelled("Replaced by a newer job")
+                    return waiter.result()
+                if request is not None and await request.is_disconnected():
+                    self.stats["disconnects"] += 1
+                    raise LLMRequestCancelled("Client disconnected")
+        finally:
+            if not future.done():
+                future.cancel()
+
+    def _loop(self):
+        while True:
+            _, _, fn, args, kwargs, future, queued, latest_key = self.queue.get()
+            if latest_key is not None:
+                with self._lock:
+                    if self._latest.get(latest_key) is future:
+                        del self._latest[latest_key]
+            if not future.set_running_or_notify_cancel():
+                self.stats["skipped"] += 1
+                continue
+            started = time.perf_counter()
+            self.stats["waitSeconds"] += started - queued
+            try:
+                result = fn(get_model(self.model_name), future.cancel_event, *args, **kwargs)
+            except Exception as e:
+                print(f"[LLM] Job failed: {e}")
+                self.stats["failed"] += 1
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            finally:
+                elapsed = time.perf_counter() - started
+                self.stats["jobs"] += 1
+                self.stats["busySeconds"] += elapsed
+                if future.cancel_event.is_set():
+                    self.stats["stopped"] += 1
+                    print(f"[LLM] Job stopped after {elapsed:.2f}s, caller gave up")
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_llm_service(model_name: str) -> LLMService:
+    with _services_lock:
+        if model_name not in _services:
+            _services[model_name] = LLMService(model_name)
+        return _services[model_name]
+
+
+def llm_stats() -> dict:
+    """
+    Jobs, cancellations, queue depth and busy time per model, and how often a
+    prompt prefix was reused, for the metrics endpoint.
+    """
+    with _services_lock:
+        services = {
+            name: {
+                **service.stats,
+                "busySeconds": round(service.stats["busySeconds"], 3),
+                "waitSeconds": round(service.stats["waitSeconds"], 3),
+                "queued": service.queue.qsize(),
+            }
+            for name, service in _services.items()
+        }
+    return {"models": services, "prefixCache": {**prefix_stats, "saved": len(_prefix_states)}}
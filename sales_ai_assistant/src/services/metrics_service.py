@@ -0,0 +1,192 @@
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+from src.services.model_registry import current_rss_bytes
+
+# Per-stage timing of the meeting pipeline. A trace is opened for one meeting
+# (finalize, post-processing, ...) and every `stage()` entered while it is
+# current records a span. The trace lives in a ContextVar, so spans opened inside
+# the ML worker pools (run_in_ml_pool copies the context) land in the same trace.
+#
+# CPU time is process-wide: with several meetings in flight it includes their
+# work too. Peak RSS is the highest process RSS seen while the span was open,
+# sampled every RSS_SAMPLE_SECONDS by one shared thread (the kernel high-water
+# mark cannot be reset per span while other spans are open); short spikes between
+# samples can be missed.
+
+METRICS_HISTORY = int(os.getenv("METRICS_HISTORY", "100"))
+RSS_SAMPLE_SECONDS = float(os.getenv("RSS_SAMPLE_SECONDS", "0.05"))
+
+_current_trace = contextvars.ContextVar("pipeline_trace", default=None)
+_recent_traces = deque(maxlen=METRICS_HISTORY)
+_recent_lock = threading.Lock()
+
+
+_open_peaks = set()
+_sampler_lock = threading.Condition()
+_sampler = None
+
+
+class PeakRss:
+    """Highest resident set size between start() and stop(), in bytes."""
+
+    def __init__(self):
+        self.peak = None
+
+    def start(self):
+        global _sampler
+        self.peak = current_rss_bytes()
+        with _sampler_lock:
+            _open_peaks.add(self)
+            if _sampler is None:
+                _sampler = threading.Thread(target=_sample_rss, name="rss-sampler", daemon=True)
+                _sampler.start()
+            _sampler_lock.notify()
+        return self
+
+    def stop(self) -> int:
+        with _sampler_lock:
+            _open_peaks.discard(self)
+        self.peak = max(self.peak, current_rss_bytes())
+        return self.peak
+
+
+def _sample_rss():
+    while True:
+        with _sampler_lock:
+            while not _open_peaks:
+                _sampler_lock.wait()
+        rss = current_rss_bytes()
+        with _sampler_lock:
+            for tracker in _open_peaks:
+                tracker.peak = max(tracker.peak, rss)
+        time.sleep(RSS_SAMPLE_SECONDS)
+
+
+class PipelineTrace:
+    def __init__(self, kind: str, meeting_id: str = None, **attributes):
+        self.kind = kind
+        self.meeting_id = meeting_id
+        self.attributes = attributes
+        self.spans = []
+        self.started_at = datetime.utcnow()
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        self._peak_rss = PeakRss().start()
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self.error = None
+
+    def add_span(self, span: dict):
+        self.spans.append(span)
+
+    def finish(self, error: str = None):
+        self.wall_seconds = round(time.perf_counter() - self._started, 3)
+        self.cpu_seconds = round(time.process_time() - self._cpu_started, 3)
+        self._peak_rss.stop()
+        self.error = error
+
+    def to_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "meetingId": self.meeting_id,
+            **self.attributes,
+            "startedAt": self.started_at.isoformat() + "Z",
+            "wallSeconds": self.wall_seconds,
+            "cpuSeconds": self.cpu_seconds,
+            "peakRssBytes": self._peak_rss.peak,
+            "error": self.error,
+            "spans": list(self.spans),
+        }
+
+
+def current_trace() -> Optional[PipelineTrace]:
+    return _current_trace.get()
+
+
+def start_trace(kind: str, meeting_id: str = None, **attributes) -> PipelineTrace:
+    """Open a trace and make it current for this task (and the work it hands to pools)."""
+    trace = PipelineTrace(kind, meeting_id, **attributes)
+    _current_trace.set(trace)
+    return trace
+
+
+def finish_trace(trace: PipelineTrace, error: str = None) -> dict:
+    """Close `trace`, keep it in the in-memory history and return its document."""
+    trace.finish(error)
+    if _current_trace.get() is trace:
+        _current_trace.set(None)
+    doc = trace.to_dict()
+    with _recent_lock:
+        _recent_traces.append(doc)
+    print(f"[METRICS] {trace.kind} {trace.meeting_id}: {trace.wall_seconds:.2f}s over {len(trace.spans)} stages")
+    return doc
+
+
+@contextmanager
+def stage(name: str, audio_seconds: float = None):
+    """
+    Record a span for `name` in the current trace; a no-op without one.
+
+    Yields the span dict, so `audio_seconds` can also be filled in once known.
+    Real-time factor is wall time divided by audio seconds.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield {}
+        return
+
+    span = {"stage": name, "audioSeconds": audio_seconds, "thread": threading.current_thread().name}
+    peak_rss = PeakRss().start()
+    rss_before = peak_rss.peak
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    try:
+        yield span
+    except BaseException as e:
+        span["error"] = repr(e)
+        raise
+    finally:
+        wall = time.perf_counter() - started
+        span["wallSeconds"] = round(wall, 3)
+        span["cpuSeconds"] = round(time.process_time() - cpu_started, 3)
+        span["rssStartBytes"] = rss_before
+        span["rssEndBytes"] = current_rss_bytes()
+        span["peakRssBytes"] = peak_rss.stop()
+        if span.get("audioSeconds"):
+            span["audioSeconds"] = round(span["audioSeconds"], 2)
+            span["rtf"] = round(wall / span["audioSeconds"], 3)
+        else:
+            span["rtf"] = None
+        trace.add_span(span)
+
+
+def recent_traces(limit: int = None) -> list:
+    with _recent_lock:
+        traces = list(_recent_traces)
+    return traces[-limit:] if limit else traces
+
+
+def stage_summary() -> dict:
+    """Aggregate the recent spans per stage: count, total and mean wall time, mean RTF."""
+    summary = {}
+    for trace in recent_traces():
+        for span in trace["spans"]:
+            entry = summary.setdefault(span["stage"], {"count": 0, "wallSeconds": 0.0, "rtfs": []})
+            entry["count"] += 1
+            entry["wallSeconds"] += span["wallSeconds"]
+            if span.get("rtf") is not None:
+                entry["rtfs"].append(span["rtf"])
+
+    for entry in summary.values():
+        rtfs = entry.pop("rtfs")
+        entry["wallSeconds"] = round(entry["wallSeconds"], 3)
+        entry["meanWallSeconds"] = round(entry["wallSeconds"] / entry["count"], 3)
+        entry["meanRtf"] = round(sum(rtfs) / len(rtfs), 3) if rtfs else None
+    return summary
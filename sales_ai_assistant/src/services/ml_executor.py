@@ -0,0 +1,45 @@
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Dedicated worker pools for the CPU-heavy model calls, so FastAPI handlers can
+# await them without blocking the event loop. Threads (not processes) are used
+# because the models are large, loaded once per process and release the GIL
+# inside torch / CTranslate2 kernels; the pool sizes bound how many calls of each
+# model type run at the same time.
+ML_POOL_SIZES = {
+    "whisper": int(os.getenv("ML_WHISPER_WORKERS", "1")),
+    "pyannote": int(os.getenv("ML_PYANNOTE_WORKERS", "1")),
+    "ecapa": int(os.getenv("ML_ECAPA_WORKERS", "2")),
+    # Decoding uploaded audio (soundfile / ffmpeg)
+    "audio": int(os.getenv("ML_AUDIO_WORKERS", "2")),
+}
+
+_pools = {}
+
+
+def get_ml_pool(kind: str) -> ThreadPoolExecutor:
+    if kind not in ML_POOL_SIZES:
+        raise ValueError(f"Unknown ML pool: {kind}")
+    pool = _pools.get(kind)
+    if pool is None:
+        pool = ThreadPoolExecutor(max_workers=ML_POOL_SIZES[kind], thread_name_prefix=f"ml-{kind}")
+        _pools[kind] = pool
+    return pool
+
+
+async def run_in_ml_pool(kind: str, fn, *args, **kwargs):
+    """Run a blocking model call on the pool for `kind` and await its result."""
+    loop = asyncio.get_running_loop()
+    # Copy the caller's context so context variables stay visible in the worker.
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, fn, *args, **kwargs)
+    return await loop.run_in_executor(get_ml_pool(kind), call)
+
+
+def shutdown_ml_pools():
+    for pool in _pools.values():
+        pool.shutdown(wait=False, cancel_futures=True)
+    _pools.clear()
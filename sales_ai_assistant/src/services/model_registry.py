@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+# Central registry of the ML models used by the API. Every model is loaded lazily
+# on first use and shared by all callers in the process, instead of each service
+# module loading its own copy at import time.
+
+LLM_MODEL_PATH = os.path.abspath("src/prediction_models/mistral-7b-instruct-v0.1.Q4_K_M.gguf")
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "4096"))
+
+_loaders = {}
+_models = {}
+_info = {}
+_load_lock = threading.Lock()
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is the peak, in KiB on Linux; best effort on other platforms.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def register_model(name: str, loader):
+    """Register (or replace) the loader for a model; drops any resident instance."""
+    with _load_lock:
+        _loaders[name] = loader
+        _models.pop(name, None)
+        _info.pop(name, None)
+
+
+def get_model(name: str):
+    """Return the shared instance of `name`, loading it on first use."""
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _load_lock:
+        model = _models.get(name)
+        if model is not None:
+            return model
+        if name not in _loaders:
+            raise KeyError(f"Unknown model: {name}")
+
+        print(f"[MODEL] Loading {name}...")
+        rss_before = current_rss_bytes()
+        started = time.perf_counter()
+        model = _loaders[name]()
+        load_seconds = time.perf_counter() - started
+        rss_delta = max(current_rss_bytes() - rss_before, 0)
+
+        _models[name] = model
+        _info[name] = {
+            "name": name,
+            "loadedAt": datetime.utcnow().isoformat() + "Z",
+            "loadSeconds": round(load_seconds, 2),
+            "memoryBytes": rss_delta,
+        }
+        print(f"[MODEL] Loaded {name} in {load_seconds:.1f}s (+{rss_delta / 2**20:.0f} MiB RSS)")
+        return model
+
+
+def resident_models() -> dict:
+    """Report which models are resident and the memory each added when it was loaded."""
+    return {
+        "models": [dict(_info[name]) for name in _models],
+        "registered": sorted(_loaders),
+        "processRssBytes": current_rss_bytes(),
+    }
+
+
+def _load_torch_device():
+    import torch
+    return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+
+def _load_pyannote_diarization():
+    from pyannote.audio import Pipeline
+    from src.config import HUGGINGFACE_TOKEN
+    return Pipeline.from_pretrained(
+        "pyannote/speaker-diarization-3.1",
+        use_auth_token=HUGGINGFACE_TOKEN
+    )
+
+
+def _load_ecapa():
+    from speechbrain.inference.speaker import EncoderClassifier
+    return EncoderClassifier.from_hparams(
+        source="speechbrain/spkrec-ecapa-voxceleb",
+        run_opts={"device": str(_load_torch_device())}
+    )
+
+
+def _load_ecapa_onnx(quantized: bool = False):
+    # ONNX Runtime runs on CPU, so the feature extraction stays on CPU too
+    from speechbrain.inference.speaker import EncoderClassifier
+    from src.services.speaker_encoder_backends import load_onnx_encoder
+    classifier = EncoderClassifier.from_hparams(
+        source="speechbrain/spkrec-ecapa-voxceleb",
+        run_opts={"device": "cpu"}
+    )
+    return load_onnx_encoder(classifier, quantized=quantized)
+
+
+def _load_openai_whisper_large():
+    import whisper
+    return whisper.load_model("large")
+
+
+def _load_faster_whisper_base():
+    from faster_whisper import WhisperModel
+    return WhisperModel("base")
+
+
+def _load_faster_whisper_large_int8():
+    from faster_whisper import WhisperModel
+    return WhisperModel("large", compute_type="int8")
+
+
+def _load_mistral_7b():
+    from llama_cpp import Llama
+    return Llama(
+        model_path=LLM_MODEL_PATH,
+        n_ctx=LLM_CONTEXT_TOKENS,  # context size
+        n_threads=8,  # adjust for your CPU
+    )
+
+
+def _load_mistral_7b_tokenizer():
+    # Vocabulary only: no weights or KV cache, safe to use from any thread
+    from llama_cpp.llama_tokenizer import LlamaTokenizer
+    return LlamaTokenizer.from_ggml_file(LLM_MODEL_PATH)
+
+
+register_model("pyannote_diarization", _load_pyannote_diarization)
+register_model("ecapa", _load_ecapa)
+register_model("ecapa_onnx", _load_ecapa_onnx)
+register_model("ecapa_onnx_int8", lambda: _load_ecapa_onnx(quantized=True))
+register_model("openai_whisper_large", _load_openai_whisper_large)
+register_model("faster_whisper_base", _load_faster_whisper_base)
+register_model("faster_whisper_large_int8", _load_faster_whisper_large_int8)
+register_model("mistral_7b", _load_mistral_7b)
+register_model("mistral_7b_tokenizer", _load_mistral_7b_tokenizer)
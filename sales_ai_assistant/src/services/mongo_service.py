@@ -4,6 +4,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from src.config import MONGO_URL, MONGO_DB_NAME
 from datetime import datetime, timedelta
 from pymongo import DESCENDING
+from pymongo.errors import OperationFailure
 import logging
 import re
 
@@ -24,6 +25,9 @@ suggestion_collection = db["suggestions"]
 meeting_summry_collection = db["events"]
 calendar_events_collection = db["events"]
 calendar_events_tasks_collection = db["calendarEventsTasks"]
+organizations_collection = db["organizations"]
+pipeline_metrics_collection = db["pipelineMetrics"]
+llm_responses_collection = db["llmResponses"]
 
 # Try to extract number from LLM response
 def extract_number(text: str) -> int:
@@ -53,6 +57,15 @@ async def save_transcript_to_db(meetingId: str, transcript_data: List[dict], rec
         return False
 
 
+async def save_speaker_registry(meetingId: str, registry_data: dict) -> bool:
+    """Persist the meeting's speaker registry (centroids of unknown speakers)."""
+    result = await calendar_events_collection.update_one(
+        {"meetingId": meetingId},
+        {"$set": {"speakerRegistry": registry_data}}
+    )
+    return result.matched_count > 0
+
+
 # Save chunk metadata
 async def save_chunk_metadata(meetingId: str, chunk_name: str, userId: str, transcript: str, s3_url: str , eventId: str, container_id: str):
     now = datetime.utcnow()
@@ -85,7 +98,7 @@ async def get_chunk_list(meetingId: str):
     return doc["chunks"] if doc else []
 
 # Save final audio
-async def save_final_audio(meetingId: str, s3_url: str, results: list, userId: str):
+async def save_final_audio(meetingId: str, s3_url: str, results: list, userId: str, canonical_url: Optional[str] = None):
     now = datetime.utcnow()
     doc = {
         "meetingId": meetingId,
@@ -95,6 +108,9 @@ async def save_final_audio(meetingId: str, s3_url: str, results: list, userId: s
         "createdAt": now,
         "updatedAt": now
     }
+    if canonical_url:
+        # 16 kHz mono PCM copy used for reprocessing
+        doc["canonical_url"] = canonical_url
     result = await final_col.insert_one(doc)
     return result.inserted_id
 
@@ -103,7 +119,7 @@ async def get_final_audio(meetingId: str):
     return doc
 
 # Save salesperson sample
-async def save_salesperson_sample(filename: str, s3_url: str, userId: str):
+async def save_salesperson_sample(filename: str, s3_url: str, userId: str, embedding: Optional[list] = None, embeddings: Optional[dict] = None):
     now = datetime.utcnow()
     doc = {
         "filename": filename,
@@ -113,6 +129,10 @@ async def save_salesperson_sample(filename: str, s3_url: str, userId: str):
         "updatedAt": now,
         "userId": userId
     }
+    if embedding is not None:
+        doc["embedding"] = embedding
+    # Embeddings in other speaker-embedding spaces, keyed by field name
+    doc.update(embeddings or {})
     result = await sales_col.insert_one(doc)
     return result.inserted_id
 
@@ -122,6 +142,119 @@ async def get_salesperson_sample(userId: str):
     print(f"data.. {result}")
     return result
 
+# Get all enrolled voice samples of a salesperson
+async def get_salesperson_samples(userId: str) -> list:
+    cursor = sales_col.find({"userId": userId}).sort("createdAt", 1)
+    return await cursor.to_list(length=None)
+
+# Store the speaker embedding computed for one voice sample
+async def set_salesperson_sample_embedding(sample_id, embedding: list, field: str = "embedding") -> bool:
+    result = await sales_col.update_one(
+        {"_id": ObjectId(sample_id)},
+        {"$set": {field: embedding, "updatedAt": datetime.utcnow()}}
+    )
+    return result.modified_count > 0
+
+# Store the centroid of all voice samples on every sample of the salesperson
+async def update_salesperson_centroid(userId: str, centroid: list, sample_count: int, field: str = "centroid") -> int:
+    result = await sales_col.update_many(
+        {"userId": userId},
+        {"$set": {
+            field: centroid,
+            f"{field}SampleCount": sample_count,
+            "updatedAt": datetime.utcnow()
+        }}
+    )
+    return result.modified_count
+
+# Drop a stored centroid of a salesperson so it is recomputed on next use
+async def clear_salesperson_centroid(userId: str, field: str = "centroid") -> int:
+    result = await sales_col.update_many(
+        {"userId": userId, field: {"$exists": True}},
+        {"$unset": {field: "", f"{field}SampleCount": ""}}
+    )
+    return result.modified_count
+
+# Get the enrolled reference embedding (centroid) of a salesperson
+async def get_salesperson_embedding(userId: str, field: str = "centroid") -> Optional[list]:
+    doc = await sales_col.find_one(
+        {"userId": userId, field: {"$exists": True}},
+        sort=[("updatedAt", DESCENDING)]
+    )
+    return doc[field] if doc else None
+
+def _id_variants(value) -> list:
+    # Ids are stored as ObjectId in some collections and as strings in others
+    variants = [str(value)]
+    if ObjectId.is_valid(str(value)):
+        variants.append(ObjectId(str(value)))
+    return variants
+
+# Get the enrolled voice centroids of every salesperson in an organization
+async def get_org_salesperson_embeddings(organizationId: str, field: str = "centroid") -> list:
+    users = await users_collection.find(
+        {"organizationId": {"$in": _id_variants(organizationId)}},
+        {"name": 1}
+    ).to_list(length=None)
+    names = {str(user["_id"]): user.get("name") for user in users}
+    if not names:
+        return []
+
+    cursor = sales_col.find(
+        {"userId": {"$in": list(names)}, field: {"$exists": True}},
+        {"userId": 1, field: 1}
+    ).sort("updatedAt", DESCENDING)
+    reps = {}
+    async for doc in cursor:
+        reps.setdefault(doc["userId"], {
+            "userId": doc["userId"],
+            "name": names.get(doc["userId"]),
+            "centroid": doc[field]
+        })
+    return list(reps.values())
+
+# Get the salesperson-match threshold configured for an organization
+async def get_organization_speaker_threshold(organizationId: str) -> Optional[float]:
+    doc = await organizations_collection.find_one(
+        {"_id": {"$in": _id_variants(organizationId)}},
+        {"speakerMatchThreshold": 1}
+    )
+    if doc and doc.get("speakerMatchThreshold") is not None:
+        return float(doc["speakerMatchThreshold"])
+    return None
+
+# Save the per-stage timings of one pipeline run
+async def save_pipeline_metrics(metrics: dict):
+    doc = dict(metrics, createdAt=datetime.utcnow())
+    result = await pipeline_metrics_collection.insert_one(doc)
+    return result.inserted_id
+
+# Get the stored pipeline runs of a meeting, newest first
+async def get_pipeline_metrics(meetingId: str) -> list:
+    cursor = pipeline_metrics_collection.find({"meetingId": meetingId}, {"_id": 0}).sort("createdAt", DESCENDING)
+    return await cursor.to_list(length=None)
+
+# Get a cached LLM answer by its prompt hash
+async def get_llm_response(key: str) -> Optional[dict]:
+    return await llm_responses_collection.find_one({"_id": key})
+
+# Cache an LLM answer; the TTL index on createdAt removes it later
+async def save_llm_response(key: str, response: str, model: str):
+    await llm_responses_collection.replace_one(
+        {"_id": key},
+        {"response": response, "model": model, "createdAt": datetime.utcnow()},
+        upsert=True
+    )
+
+# Create the TTL index of the LLM answer cache, or change its expiry
+async def ensure_llm_response_ttl(ttl_seconds: int):
+    try:
+        await llm_responses_collection.create_index("createdAt", expireAfterSeconds=ttl_seconds)
+    except OperationFailure:
+        # Index exists with another expiry
+        await db.command("collMod", "llmResponses",
+                         index={"keyPattern": {"createdAt": 1}, "expireAfterSeconds": ttl_seconds})
+
 # Save transcription chunk
 async def save_transcription_chunk(meetingId: str, s3_url: str, transcript: str, userId: str):
     now = datetime.utcnow()
@@ -1,14 +1,15 @@
-import os
-from llama_cpp import Llama
+import asyncio
+from src.services.model_registry import LLM_MODEL_PATH
+from src.services.llm_service import get_llm_service, complete_with_prefix, PRIORITY_INTERACTIVE
+from src.services import llm_response_cache
+from src.services.token_budget import fit_content
 
-MODEL_PATH = os.path.abspath("src/prediction_models/mistral-7b-instruct-v0.1.Q4_K_M.gguf")
+MODEL_PATH = LLM_MODEL_PATH
+LLM_MODEL = "mistral_7b"
 
-# Load the model
-llm = Llama(
-    model_path=MODEL_PATH,
-    n_ctx=4096,  # context size
-    n_threads=8,  # adjust for your CPU
-)
+
+def llm_service():
+    return get_llm_service(LLM_MODEL)
 
 # Define the prompt
 # prompt = """<s>[INST] Summarize this meeting transcript:
@@ -27,7 +28,60 @@ llm = Llama(
 # print(output["choices"][0]["text"])
 
 
-def run_instruction(task: str, content: str, max_tokens: int = 300) -> str:
-    prompt = f"<s>[INST] {task}:\n\n{content}\n\n[/INST]"
-    output = llm(prompt, max_tokens=max_tokens, stop=["</s>"])
-    return output["choices"][0]["text"].strip()
+def prompt_parts(task: str, content: str) -> tuple:
+    # Content first and the instruction last, so instructions over the same
+    # content share a prompt prefix (BOS is added when tokenizing)
+    return f"[INST] {content}\n\n", f"{task} [/INST]"
+
+
+def fit_instruction(task: str, content: str, max_tokens: int, keep: str = "end") -> tuple:
+    """(content, max_tokens) cut so the prompt and the answer fit in the context (see token_budget)."""
+    return fit_content(content, max_tokens, *prompt_parts(task, ""), keep=keep)
+
+
+async def fit_shared_content(tasks: list, content: str, max_tokens: int = 300, keep: str = "end") -> str:
+    """
+    `content` cut once to fit with the longest of `tasks`, so it stays the same
+    for every task and keeps its shared prompt prefix.
+    """
+    content, _ = await asyncio.to_thread(fit_instruction, max(tasks, key=len), content, max_tokens, keep)
+    return content
+
+
+async def run_instruction_async(task: str, content: str, max_tokens: int = 300, timeout: float = None,
+                                request=None, share_context: bool = False, use_cache: bool = True,
+                                keep: str = "end", priority: int = PRIORITY_INTERACTIVE,
+                                latest_key: str = None) -> str:
+    """
+    Queue the instruction on the LLM inference thread and await the answer.
+
+    Pass the route's `request` to cancel the job when its client disconnects.
+    Set `share_context` only when several instructions run over the same content:
+    the evaluated content is then snapshotted (a copy of the KV state, hundreds of
+    MB for a long transcript) and restored for the next ones. A lone instruction
+    gains nothing from the snapshot. Answers are
+    cached (see llm_response_cache); `use_cache=False` always runs the model and
+    leaves the cache untouched. Background work passes PRIORITY_BACKGROUND, and a
+    `latest_key` when only its newest job matters (see llm_service).
+
+    Content that would not leave room for `max_tokens` of answer is cut first,
+    from its start (keep="end", oldest turns) or its end (keep="start").
+    """
+    content, max_tokens = await asyncio.to_thread(fit_instruction, task, content, max_tokens, keep)
+    prefix, suffix = prompt_parts(task, content)
+    sampling = {"max_tokens": max_tokens, "stop": ["</s>"]}
+    if not use_cache:
+        llm_response_cache.cache_stats["bypassed"] += 1
+    else:
+        key = llm_response_cache.response_key([prefix, suffix], **sampling)
+        cached = await llm_response_cache.get_response(key)
+        if cached is not None:
+            return cached
+
+    output = await llm_service().call_async(complete_with_prefix, prefix, suffix, cache_prefix=share_context,
+                                            timeout=timeout, request=request, priority=priority,
+                                            latest_key=latest_key, **sampling)
+    response = output["choices"][0]["text"].strip()
+    if use_cache:
+        await llm_response_cache.put_response(key, response)
+    return response
@@ -0,0 +1,133 @@
+import asyncio
+import os
+from collections import deque
+import numpy as np
+
+from src.services.ml_executor import run_in_ml_pool
+from src.services.speaker_identification import (
+    run_diarization, diarization_turns, label_speakers, transcribe_turns, build_segments, load_audio_tensor,
+    pipeline_config, as_salesperson_matcher, SPEAKER_EMBEDDING_SOURCE, SINGLE_PASS_ASR
+)
+from src.services.vad_service import remove_silence, vad_config
+from src.services.speaker_registry import SpeakerRegistry
+from src.services.transcript_cache import cache_key, get_cached, put_cached
+from src.services.metrics_service import stage
+from src.services.audio_io import duration_seconds
+
+# End-to-end processing of one decoded recording: VAD, diarization, speaker
+# labelling and transcription. Each stage runs on its ML worker pool: diarization
+# on "pyannote", speaker labelling on "ecapa" (also for the pyannote embedding
+# space) and transcription on "whisper".
+
+# Recordings of a meeting downloaded at the same time
+RECORDING_DOWNLOAD_CONCURRENCY = int(os.getenv("RECORDING_DOWNLOAD_CONCURRENCY", "3"))
+# Recordings fetched ahead of the one being transcribed; bounds decoded audio in memory
+RECORDING_PREFETCH_AHEAD = int(os.getenv("RECORDING_PREFETCH_AHEAD", "2"))
+
+
+def remap_segments(segments: list, timeline) -> list:
+    """Move segment timestamps from the speech-only audio back to the original recording."""
+    for segment in segments:
+        segment["start"] = round(timeline.to_original(segment["start"]), 2)
+        segment["end"] = round(timeline.to_original(segment["end"], is_end=True), 2)
+    return segments
+
+
+async def transcribe_recording(audio: np.ndarray, ref_embedding, speaker_registry: SpeakerRegistry = None,
+                               meeting_id: str = None) -> list:
+    """
+    Diarize and transcribe a mono 16 kHz recording.
+
+    `ref_embedding` is a reference embedding or a SalespersonMatcher, in the
+    SPEAKER_EMBEDDING_SOURCE space (see get_salesperson_matcher). Returns the
+    {speaker, start, end, text} list produced by process_segments, with
+    timestamps on the original timeline. `speaker_registry` carries speaker labels
+    over from earlier recordings of the same meeting and is updated in place;
+    `meeting_id` lets decoding reuse the meeting's pinned language.
+
+    Results are cached by audio content, pipeline settings, salesperson references
+    and the registry state, so repeating the same call is served from the cache.
+    """
+    if speaker_registry is None:
+        speaker_registry = SpeakerRegistry()
+    matcher = as_salesperson_matcher(ref_embedding)
+    seconds = duration_seconds(audio)
+    with stage("cache_lookup", audio_seconds=seconds) as span:
+        key = await run_in_ml_pool(
+            "audio", cache_key, audio,
+            pipeline_config(), vad_config(), matcher.fingerprint(), speaker_registry.to_dict()
+        )
+        cached = await run_in_ml_pool("audio", get_cached, key)
+        span["hit"] = cached is not None
+    if cached is not None:
+        speaker_registry.restore(cached["registry"])
+        return cached["segments"]
+
+    segments = []
+    with stage("vad", audio_seconds=seconds):
+        speech, timeline = await run_in_ml_pool("audio", remove_silence, audio)
+    if len(speech) == 0:
+        print("[PIPELINE] No speech detected, skipping diarization")
+    else:
+        speech_seconds = duration_seconds(speech)
+        cluster_embeddings = None
+        with stage("diarization", audio_seconds=speech_seconds):
+            if SPEAKER_EMBEDDING_SOURCE == "pyannote":
+                # Keep the centroids pyannote clustered with, to label speakers per cluster
+                diarization, cluster_embeddings = await run_in_ml_pool(
+                    "pyannote", run_diarization, speech, return_embeddings=True
+                )
+            else:
+                diarization = await run_in_ml_pool("pyannote", run_diarization, speech)
+        waveform = load_audio_tensor(speech)
+        turns = diarization_turns(diarization)
+        with stage("speaker_labelling", audio_seconds=speech_seconds) as span:
+            labels = await run_in_ml_pool(
+                "ecapa", label_speakers, waveform, turns, matcher, speaker_registry, cluster_embeddings
+            )
+            span["turns"] = len(turns)
+        with stage("asr", audio_seconds=speech_seconds) as span:
+            texts = await run_in_ml_pool("whisper", transcribe_turns, waveform, turns, meeting_id=meeting_id)
+            span["singlePass"] = SINGLE_PASS_ASR
+        segments = remap_segments(build_segments(turns, labels, texts), timeline)
+
+    await run_in_ml_pool("audio", put_cached, key, {"segments": segments, "registry": speaker_registry.to_dict()})
+    return segments
+
+
+async def prefetch_in_order(items: list, fetch, concurrency: int = None, ahead: int = None):
+    """
+    Yield (item, await fetch(item)) in the order of `items`, fetching ahead.
+
+    While the caller works on one item, up to `ahead` following items are already
+    being fetched, at most `concurrency` at a time. An exception from a fetch is
+    raised when its item is reached; fetches still in flight are then cancelled.
+    """
+    concurrency = concurrency or RECORDING_DOWNLOAD_CONCURRENCY
+    ahead = RECORDING_PREFETCH_AHEAD if ahead is None else ahead
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def guarded(item):
+        async with semaphore:
+            return await fetch(item)
+
+    remaining = iter(items)
+    pending = deque()
+
+    def schedule(limit: int):
+        while len(pending) < limit:
+            item = next(remaining, None)
+            if item is None:
+                return
+            pending.append((item, asyncio.create_task(guarded(item))))
+
+    # The first item plus `ahead` more; afterwards keep `ahead` behind the current one
+    schedule(ahead + 1)
+    try:
+        while pending:
+            item, task = pending.popleft()
+            schedule(ahead)
+            yield item, await task
+    finally:
+        for _, task in pending:
+            task.cancel()
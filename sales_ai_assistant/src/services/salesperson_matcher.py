@@ -0,0 +1,64 @@
+import hashlib
+import os
+import numpy as np
+from src.services.speaker_registry import normalize_rows, SPEAKER_EMBEDDING_SOURCE
+
+# Matches speaker embeddings against every enrolled salesperson of an
+# organization at once: one (turns x reps) matmul instead of one comparison per
+# rep, with the threshold configurable per organization.
+
+# Cosine similarity a turn or cluster needs to be labelled as a rep, per
+# embedding space; SALESPERSON_THRESHOLD overrides every space. ECAPA keeps the
+# historical 0.6. For the pyannote (WeSpeaker) space the pipeline's own
+# clustering cut, similarity 0.30 between centroids, is the point where two
+# clusters count as one speaker; an enrolled sample is recorded apart from the
+# meeting, so the rep match asks for a 0.1 margin above it. Organizations can
+# still tune theirs with speakerMatchThreshold.
+SALESPERSON_THRESHOLDS = {
+    "ecapa": float(os.getenv("SALESPERSON_THRESHOLD", "0.6")),
+    "pyannote": float(os.getenv("SALESPERSON_THRESHOLD", "0.4")),
+}
+SALESPERSON_THRESHOLD = SALESPERSON_THRESHOLDS[SPEAKER_EMBEDDING_SOURCE]
+
+
+class SalespersonMatcher:
+    def __init__(self, embeddings, user_ids: list = None, names: list = None, threshold: float = SALESPERSON_THRESHOLD):
+        self.matrix = normalize_rows(embeddings)  # (num_reps, dim)
+        count = len(self.matrix)
+        self.user_ids = list(user_ids) if user_ids else [None] * count
+        self.names = list(names) if names else [None] * count
+        self.threshold = threshold
+
+    @classmethod
+    def single(cls, ref_embedding: np.ndarray, threshold: float = SALESPERSON_THRESHOLD):
+        return cls([ref_embedding], threshold=threshold)
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def scores(self, embeddings: np.ndarray) -> np.ndarray:
+        """Cosine similarity of each embedding against each rep, shape (n, num_reps)."""
+        return normalize_rows(embeddings) @ self.matrix.T
+
+    def match(self, embeddings: np.ndarray):
+        """
+        Return (rep_index, best_score) arrays for the embeddings.
+
+        rep_index is -1 where the best score does not clear the threshold.
+        """
+        scores = self.scores(embeddings)
+        best = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(scores)), best]
+        rep_index = np.where(best_scores > self.threshold, best, -1)
+        return rep_index, best_scores
+
+    def fingerprint(self) -> list:
+        """Values that identify this matcher's output, for cache keys."""
+        digest = hashlib.blake2b(np.ascontiguousarray(self.matrix), digest_size=16).hexdigest()
+        return [digest, self.threshold, self.names]
+
+    def label(self, rep_index: int) -> str:
+        # A single enrolled rep keeps the historical "Salesperson" label
+        if len(self) == 1:
+            return "Salesperson"
+        return f"Salesperson ({self.names[rep_index] or rep_index + 1})"
@@ -0,0 +1,143 @@
+import os
+import numpy as np
+
+# CPU backends for the ECAPA speaker encoder. SpeechBrain's EncoderClassifier
+# computes Fbank features, normalises them and runs the ECAPA-TDNN embedding
+# model; the first two steps are cheap and stay in PyTorch, the embedding model
+# is exported once to ONNX (optionally with int8 weights) and run in ONNX
+# Runtime. The wrapper keeps the encode_batch(wavs, wav_lens) -> (batch, 1, dim)
+# interface, so the rest of the pipeline does not care which backend is active.
+#
+# When loaded, a backend is checked against the PyTorch embeddings; if any test
+# signal falls below SPEAKER_ENCODER_MIN_COSINE the PyTorch encoder is used.
+
+ECAPA_ONNX_DIR = os.path.abspath(os.getenv("ECAPA_ONNX_DIR", "src/prediction_models/ecapa"))
+ECAPA_ONNX_THREADS = int(os.getenv("ECAPA_ONNX_THREADS", "0"))  # 0: ONNX Runtime default
+SPEAKER_ENCODER_PARITY_CHECK = os.getenv("SPEAKER_ENCODER_PARITY_CHECK", "true").lower() in ("1", "true", "yes")
+SPEAKER_ENCODER_MIN_COSINE = float(os.getenv("SPEAKER_ENCODER_MIN_COSINE", "0.98"))
+ONNX_OPSET = 17
+SAMPLE_RATE = 16000
+# Lengths of the parity test signals, in seconds
+PARITY_SECONDS = (1.0, 3.0, 8.0)
+
+
+def onnx_model_path(quantized: bool = False) -> str:
+    return os.path.join(ECAPA_ONNX_DIR, "embedding_model.int8.onnx" if quantized else "embedding_model.onnx")
+
+
+def export_embedding_model(classifier, path: str):
+    """Export the ECAPA embedding model of a SpeechBrain EncoderClassifier to ONNX."""
+    import torch
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    model = classifier.mods.embedding_model.eval().cpu()
+    feats = classifier.mods.compute_features(torch.zeros(2, SAMPLE_RATE * 2))
+    wav_lens = torch.ones(2)
+    print(f"[ECAPA] Exporting embedding model to {path}")
+    torch.onnx.export(
+        model, (feats, wav_lens), path,
+        input_names=["feats", "wav_lens"],
+        output_names=["embeddings"],
+        dynamic_axes={"feats": {0: "batch", 1: "frames"}, "wav_lens": {0: "batch"}, "embeddings": {0: "batch"}},
+        opset_version=ONNX_OPSET,
+    )
+
+
+def quantize_embedding_model(path: str, quantized_path: str):
+    """Dynamic int8 quantization of the exported model's weights (Conv and MatMul)."""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    print(f"[ECAPA] Quantizing embedding model to {quantized_path}")
+    quantize_dynamic(path, quantized_path, weight_type=QuantType.QInt8)
+
+
+class OnnxSpeakerEncoder:
+    def __init__(self, classifier, model_path: str):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if ECAPA_ONNX_THREADS:
+            options.intra_op_num_threads = ECAPA_ONNX_THREADS
+        self.classifier = classifier
+        self.model_path = model_path
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+    def encode_batch(self, wavs, wav_lens=None):
+        import torch
+
+        wavs = wavs.float().cpu()
+        if wavs.dim() == 1:
+            wavs = wavs.unsqueeze(0)
+        wav_lens = torch.ones(wavs.shape[0]) if wav_lens is None else wav_lens.float().cpu()
+        with torch.no_grad():
+            feats = self.classifier.mods.compute_features(wavs)
+            feats = self.classifier.mods.mean_var_norm(feats, wav_lens)
+        embeddings = self.session.run(None, {"feats": feats.numpy(), "wav_lens": wav_lens.numpy()})[0]
+        return torch.from_numpy(embeddings)
+
+
+def parity_signals() -> list:
+    """Deterministic test signals: harmonic tones with noise, of several lengths."""
+    rng = np.random.default_rng(0)
+    signals = []
+    for index, seconds in enumerate(PARITY_SECONDS):
+        t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        f0 = 110.0 + 40.0 * index
+        tone = sum(np.sin(2 * np.pi * k * f0 * t) / k for k in range(1, 8))
+        signals.append((0.1 * tone + 0.01 * rng.normal(size=len(t))).astype(np.float32))
+    return signals
+
+
+def check_parity(reference, candidate) -> float:
+    """
+    Lowest cosine similarity between `reference` and `candidate` embeddings.
+
+    Signals are encoded one at a time and as one padded batch, so the length
+    masking of the candidate is exercised too.
+    """
+    import torch
+
+    signals = [torch.from_numpy(signal) for signal in parity_signals()]
+    lengths = torch.tensor([len(signal) for signal in signals], dtype=torch.float32)
+    padded = torch.nn.utils.rnn.pad_sequence(signals, batch_first=True)
+    wav_lens = lengths / lengths.max()
+
+    with torch.no_grad():
+        pairs = [
+            (reference.encode_batch(signal.unsqueeze(0)), candidate.encode_batch(signal.unsqueeze(0)))
+            for signal in signals
+        ]
+        pairs.append((reference.encode_batch(padded, wav_lens), candidate.encode_batch(padded, wav_lens)))
+
+    lowest = 1.0
+    for expected, actual in pairs:
+        expected = expected.reshape(expected.shape[0], -1).cpu().numpy()
+        actual = actual.reshape(actual.shape[0], -1).cpu().numpy()
+        cosine = (expected * actual).sum(axis=1) / (
+            np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1) + 1e-10
+        )
+        lowest = min(lowest, float(cosine.min()))
+    return lowest
+
+
+def load_onnx_encoder(classifier, quantized: bool = False):
+    """
+    Build the ONNX Runtime encoder for `classifier`, exporting it on first use.
+
+    Returns `classifier` itself when the parity check fails.
+    """
+    path = onnx_model_path(quantized)
+    if not os.path.exists(path):
+        float_path = onnx_model_path(quantized=False)
+        if not os.path.exists(float_path):
+            export_embedding_model(classifier, float_path)
+        if quantized:
+            quantize_embedding_model(float_path, path)
+
+    encoder = OnnxSpeakerEncoder(classifier, path)
+    if SPEAKER_ENCODER_PARITY_CHECK:
+        cosine = check_parity(classifier, encoder)
+        print(f"[ECAPA] Parity of {os.path.basename(path)} against PyTorch: min cosine {cosine:.4f}")
+        if cosine < SPEAKER_ENCODER_MIN_COSINE:
+            print(f"[ECAPA] Below {SPEAKER_ENCODER_MIN_COSINE}, falling back to the PyTorch encoder")
+            return classifier
+    return encoder
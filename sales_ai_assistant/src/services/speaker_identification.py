@@ -1,54 +1,200 @@
-from pyannote.audio import Pipeline
-import whisper
-from pydub import AudioSegment
 import os
 import torchaudio
 import numpy as np
 import torch
-from speechbrain.inference.speaker import EncoderClassifier
 import json
-from src.config import HUGGINGFACE_TOKEN
+import bisect
+from collections import defaultdict
+from src.services.model_registry import get_model
+from src.services.speaker_registry import SpeakerRegistry, normalize_rows, SPEAKER_EMBEDDING_SOURCE
+from src.services.salesperson_matcher import SalespersonMatcher
+from src.services.audio_io import decode_audio_bytes, get_resampler
+from src.services.metrics_service import stage
+from src.services.batched_transcription_service import WHISPER_BATCH_ENABLED, get_batched_transcriber
+from src.services.decoding_profiles import DECODING_PROFILES, decoding_options, remember_language
 # from faster_whisper import WhisperModel
 
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-# Load global models
-pipeline = Pipeline.from_pretrained(
-    "pyannote/speaker-diarization-3.1",
-    use_auth_token=HUGGINGFACE_TOKEN
-)
-speaker_recognizer = EncoderClassifier.from_hparams(
-    source="speechbrain/spkrec-ecapa-voxceleb",
-    run_opts={"device": str(device)}
-)
-whisper_model = whisper.load_model("large")
-# whisper_model = WhisperModel("base")
+# Models are loaded lazily and shared through the model registry
+PIPELINE_MODEL = "pyannote_diarization"
+# ECAPA backend: PyTorch, or ONNX Runtime with float or int8 weights
+SPEAKER_ENCODER_MODELS = {"torch": "ecapa", "onnx": "ecapa_onnx", "onnx_int8": "ecapa_onnx_int8"}
+SPEAKER_ENCODER_BACKEND = os.getenv("SPEAKER_ENCODER_BACKEND", "torch")
+SPEAKER_ENCODER_MODEL = SPEAKER_ENCODER_MODELS[SPEAKER_ENCODER_BACKEND]
+WHISPER_MODEL = "openai_whisper_large"
+# Per-turn transcription (SINGLE_PASS_ASR off) goes through the batched
+# faster-whisper decoder when batching is enabled
+BATCH_WHISPER_MODEL = "faster_whisper_large_int8"
+
+# Transcribe the whole recording once and align words to diarization turns,
+# instead of running Whisper separately on every turn.
+SINGLE_PASS_ASR = os.getenv("SINGLE_PASS_ASR", "true").lower() in ("1", "true", "yes")
+# Words whose midpoint falls outside every turn are attached to the closest
+# turn if it is at most this many seconds away, otherwise dropped.
+WORD_ALIGN_TOLERANCE = float(os.getenv("WORD_ALIGN_TOLERANCE", "0.5"))
+MIN_TURN_DURATION = 0.5
+SAMPLE_RATE = 16000
+# Seconds of a cluster's speech embedded when the pipeline gave it no centroid
+CLUSTER_EMBEDDING_SECONDS = 30.0
+# Number of diarization turns encoded per ECAPA forward pass.
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "16"))
+# Once the first CONFIDENT_TURNS embedded turns of a diarization cluster agree on
+# the same salesperson (or on none), each by at least CONFIDENCE_MARGIN from the
+# threshold, the remaining turns of that cluster reuse the decision and are not
+# embedded.
+CONFIDENT_TURNS = int(os.getenv("CONFIDENT_TURNS", "3"))
+CONFIDENCE_MARGIN = float(os.getenv("CONFIDENCE_MARGIN", "0.1"))
+
+
+def pipeline_config() -> dict:
+    """Models and settings that change process_segments output, for cache keys."""
+    return {
+        "models": [PIPELINE_MODEL, SPEAKER_ENCODER_MODEL, WHISPER_MODEL],
+        "embedding_source": SPEAKER_EMBEDDING_SOURCE,
+        "single_pass": SINGLE_PASS_ASR,
+        "batched_turns": WHISPER_BATCH_ENABLED and not SINGLE_PASS_ASR,
+        "decoding": DECODING_PROFILES["final"],
+        "word_align_tolerance": WORD_ALIGN_TOLERANCE,
+        "min_turn_duration": MIN_TURN_DURATION,
+        "confident_turns": CONFIDENT_TURNS,
+        "confidence_margin": CONFIDENCE_MARGIN,
+    }
 
 
 def transcribe_audio(file_path: str) -> str:
-    segments, _ = whisper_model.transcribe(file_path)
+    segments, _ = get_model(WHISPER_MODEL).transcribe(file_path)
     return " ".join([segment.text for segment in segments])
 
 
 
-def load_reference_embedding(audio_path: str) -> np.ndarray:
-    ref_signal, ref_fs = torchaudio.load(audio_path)
+def load_reference_embedding(audio_path) -> np.ndarray:
+    # Accepts a file path, a file-like object or a mono 16 kHz float32 array.
+    if isinstance(audio_path, np.ndarray):
+        ref_signal, ref_fs = torch.from_numpy(audio_path).unsqueeze(0), 16000
+    else:
+        ref_signal, ref_fs = torchaudio.load(audio_path)
     if ref_fs != 16000:
-        ref_signal = torchaudio.transforms.Resample(orig_freq=ref_fs, new_freq=16000)(ref_signal)
-    embedding = speaker_recognizer.encode_batch(ref_signal.to(device)).squeeze().mean(axis=0).detach().cpu().numpy()
-    return embedding
+        ref_signal = get_resampler(ref_fs, 16000)(ref_signal)
+    return embed_signal(ref_signal)
+
+
+def embed_signal(signal: torch.Tensor) -> np.ndarray:
+    """Embed a (channel, time) signal; channels are averaged into one (dim,) vector."""
+    with torch.no_grad():
+        out = get_model(SPEAKER_ENCODER_MODEL).encode_batch(signal.to(device))
+    return out[:, 0].mean(dim=0).detach().cpu().numpy()
+
+
+def load_reference_embedding_from_bytes(audio_bytes: bytes) -> np.ndarray:
+    return load_reference_embedding(decode_audio_bytes(audio_bytes))
+
+
+def compute_centroid(embeddings: list) -> np.ndarray:
+    """Average L2-normalised embeddings of several voice samples into one reference vector."""
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    centroid = matrix.mean(axis=0)
+    return centroid / np.linalg.norm(centroid)
+
+
+def run_diarization(audio_path, return_embeddings: bool = False):
+    """
+    Diarize a path or a mono 16 kHz array.
+
+    With `return_embeddings`, returns (diarization, {cluster: centroid}) using the
+    centroids the pipeline clustered with; a cluster maps to None when the pipeline
+    had no usable centroid for it.
+    """
+    # pyannote takes a path, or an in-memory waveform of shape (channel, time)
+    if isinstance(audio_path, np.ndarray):
+        audio_path = {"waveform": torch.from_numpy(audio_path).unsqueeze(0), "sample_rate": SAMPLE_RATE}
+    if not return_embeddings:
+        return get_model(PIPELINE_MODEL)(audio_path)
+
+    diarization, centroids = get_model(PIPELINE_MODEL)(audio_path, return_embeddings=True)
+    # Centroids are ordered like diarization.labels(); missing speakers are zero rows
+    cluster_embeddings = {}
+    for label, centroid in zip(diarization.labels(), np.asarray(centroids, dtype=np.float32)):
+        usable = np.isfinite(centroid).all() and np.linalg.norm(centroid) > 0
+        cluster_embeddings[label] = centroid if usable else None
+    return diarization, cluster_embeddings
+
+
+def load_pyannote_embedding(audio_path) -> np.ndarray:
+    """Embed a voice sample (path, file-like or 16 kHz array) in the diarization pipeline's space."""
+    waveform = load_audio_tensor(audio_path)
+    return embed_waveform_with_pyannote(waveform)
+
 
+def load_pyannote_embedding_from_bytes(audio_bytes: bytes) -> np.ndarray:
+    return load_pyannote_embedding(decode_audio_bytes(audio_bytes))
 
-def run_diarization(audio_path: str):
-    return pipeline(audio_path)
+
+def embed_waveform_with_pyannote(waveform: torch.Tensor) -> np.ndarray:
+    # The pipeline's own embedding model, so the weights are loaded once. Its
+    # PretrainedSpeakerEmbedding takes (batch, channel, samples), returns (batch, dim)
+    with torch.no_grad():
+        embeddings = get_model(PIPELINE_MODEL)._embedding(waveform.reshape(1, 1, -1))
+    return np.asarray(embeddings, dtype=np.float32)[0]
 
 
 def get_segment_embedding(segment_path: str) -> np.ndarray:
     signal, fs = torchaudio.load(segment_path)
     if fs != 16000:
-        signal = torchaudio.transforms.Resample(orig_freq=fs, new_freq=16000)(signal)
-    embedding = speaker_recognizer.encode_batch(signal.to(device)).squeeze().mean(axis=0).detach().cpu().numpy()
-    return embedding
+        signal = get_resampler(fs, 16000)(signal)
+    return embed_signal(signal)
+
+
+def load_audio_tensor(audio_path) -> torch.Tensor:
+    """Decode a recording once into a mono 16 kHz float tensor of shape (time,)."""
+    if isinstance(audio_path, torch.Tensor):
+        return audio_path
+    if isinstance(audio_path, np.ndarray):
+        # Already decoded by audio_io: share the buffer, no copy
+        return torch.from_numpy(audio_path)
+    signal, fs = torchaudio.load(audio_path)
+    signal = signal.mean(dim=0)
+    if fs != SAMPLE_RATE:
+        signal = get_resampler(fs, SAMPLE_RATE)(signal)
+    return signal
+
+
+def slice_turn(waveform: torch.Tensor, start: float, end: float) -> torch.Tensor:
+    """Return the samples of [start, end) seconds as a view into `waveform`."""
+    return waveform[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+
+
+def get_segment_embeddings(waveform: torch.Tensor, spans: list, batch_size: int = None) -> np.ndarray:
+    """
+    Embed many (start, end) spans of one decoded recording.
+
+    Spans are sorted by length so each padded batch wastes little compute, encoded
+    `batch_size` at a time with relative lengths passed to ECAPA so the padding is
+    masked out, and returned as an (n, dim) array in the original order.
+    """
+    batch_size = batch_size or EMBEDDING_BATCH_SIZE
+    if not spans:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    speaker_recognizer = get_model(SPEAKER_ENCODER_MODEL)
+    segments = [slice_turn(waveform, start, end) for start, end in spans]
+    order = sorted(range(len(segments)), key=lambda i: segments[i].shape[0])
+    embeddings = [None] * len(segments)
+
+    with torch.no_grad():
+        for offset in range(0, len(order), batch_size):
+            batch_ids = order[offset:offset + batch_size]
+            batch = [segments[i] for i in batch_ids]
+            lengths = torch.tensor([seg.shape[0] for seg in batch], dtype=torch.float32)
+            padded = torch.nn.utils.rnn.pad_sequence(batch, batch_first=True)
+            wav_lens = lengths / lengths.max()
+            out = speaker_recognizer.encode_batch(padded.to(device), wav_lens.to(device))
+            out = out.squeeze(1).detach().cpu().numpy()
+            for i, embedding in zip(batch_ids, out):
+                embeddings[i] = embedding
+
+    return np.stack(embeddings)
 
 
 def compute_cosine_similarity(e1, e2) -> float:
@@ -69,40 +215,303 @@ def identify_speaker(segment_embedding: np.ndarray, ref_embedding: np.ndarray, s
         return unknown_speakers[speaker], counter
 
 
-def transcribe_audio(path: str) -> str:
-    result = whisper_model.transcribe(path)
+def _transcribe_final(path, meeting_id: str = None, **kwargs) -> dict:
+    # "final" decoding profile; the meeting's pinned language skips detection
+    options = decoding_options("final", meeting_id)
+    result = get_model(WHISPER_MODEL).transcribe(path, **options, **kwargs)
+    if options["language"] is None and result.get("language"):
+        # openai-whisper reports no probability; its detection covers a full 30 s window
+        remember_language(meeting_id, result["language"], 1.0)
+    return result
+
+
+def transcribe_audio(path, meeting_id: str = None) -> str:
+    # Accepts a file path or a 16 kHz float32 array.
+    result = _transcribe_final(path, meeting_id)
     return result.get("text", "").strip()
 
 
-def process_segments(diarization, audio_path: str, ref_embedding: np.ndarray):
-    audio = AudioSegment.from_file(audio_path)
-    unknown_speakers = {}
-    counter = 1
-    results = []
+def transcribe_words(path, meeting_id: str = None) -> list:
+    """Transcribe a full recording (path or 16 kHz array) once and return its words with timestamps."""
+    result = _transcribe_final(path, meeting_id, word_timestamps=True)
+    words = []
+    for segment in result.get("segments", []):
+        for word in segment.get("words", []):
+            words.append({
+                "word": word["word"],
+                "start": float(word["start"]),
+                "end": float(word["end"]),
+            })
+    return words
+
+
+def assign_words_to_turns(words: list, turns: list) -> list:
+    """
+    Group words into diarization turns by time overlap.
+
+    `turns` is a list of (start, end) tuples sorted by start time. A word goes to
+    the turn containing its midpoint; when turns overlap the one with the largest
+    overlap wins, and words in gaps go to the nearest turn within
+    WORD_ALIGN_TOLERANCE. Returns one text string per turn.
+    """
+    texts = [[] for _ in turns]
+    if not turns:
+        return []
+    starts = [start for start, _ in turns]
+    longest = max(end - start for start, end in turns)
 
+    for word in words:
+        mid = (word["start"] + word["end"]) / 2
+        # Candidate turns start before the word ends; scan back for overlaps and,
+        # for a word in a gap, the turn ending closest before it (with overlapping
+        # turns that is not necessarily the last one to start).
+        hi = bisect.bisect_right(starts, word["end"])
+        best, best_overlap = None, 0.0
+        nearest, nearest_gap = None, WORD_ALIGN_TOLERANCE
+        for i in range(hi - 1, -1, -1):
+            start, end = turns[i]
+            if start + longest < word["start"] - WORD_ALIGN_TOLERANCE:
+                break
+            overlap = min(end, word["end"]) - max(start, word["start"])
+            if start <= mid <= end:
+                overlap += word["end"] - word["start"]
+            if overlap > best_overlap:
+                best, best_overlap = i, overlap
+            gap = max(start - mid, mid - end, 0.0)
+            if gap < nearest_gap or (gap == nearest_gap and nearest is None):
+                nearest, nearest_gap = i, gap
+
+        if best is None:
+            # The next turn starts after the word
+            if hi < len(turns):
+                gap = max(turns[hi][0] - mid, 0.0)
+                if gap <= nearest_gap:
+                    nearest = hi
+            best = nearest
+        if best is not None:
+            texts[best].append(word["word"])
+
+    return ["".join(parts).strip() for parts in texts]
+
+
+def as_salesperson_matcher(reference) -> SalespersonMatcher:
+    """Accept a single reference embedding or a SalespersonMatcher of several reps."""
+    if isinstance(reference, SalespersonMatcher):
+        return reference
+    return SalespersonMatcher.single(reference)
+
+
+def _embed_and_match(waveform: torch.Tensor, turns: list, indices: list, matcher: SalespersonMatcher):
+    """ECAPA embeddings of turns[indices] in batches, with their best rep index and score."""
+    for offset in range(0, len(indices), EMBEDDING_BATCH_SIZE):
+        batch_indices = indices[offset:offset + EMBEDDING_BATCH_SIZE]
+        batch = get_segment_embeddings(waveform, [turns[i][:2] for i in batch_indices])
+        reps, scores = matcher.match(batch)
+        yield from zip(batch_indices, batch, reps, scores)
+
+
+def label_turns(waveform: torch.Tensor, turns: list, reference, speaker_registry: SpeakerRegistry) -> list:
+    """
+    Label (start, end, cluster) turns as a salesperson or a speaker from the registry.
+
+    Each turn is matched against all enrolled reps at once (`reference` is one
+    embedding or a SalespersonMatcher). The first CONFIDENT_TURNS turns of every
+    cluster are embedded first; the other turns of a cluster they settle are not
+    embedded at all. The remaining turns of each cluster are averaged into one
+    embedding and all clusters are matched against the registry together, so
+    labels stay consistent across recordings of a meeting.
+    """
+    matcher = as_salesperson_matcher(reference)
+    # Rep index per turn, -1 when the turn is not a salesperson
+    rep_of = [None] * len(turns)
+    embeddings = [None] * len(turns)
+    evidence = defaultdict(list)
+
+    def embed(indices: list):
+        for i, embedding, rep, score in _embed_and_match(waveform, turns, indices, matcher):
+            cluster = turns[i][2]
+            embeddings[i] = embedding
+            rep_of[i] = int(rep)
+            print(f"[SIMILARITY] {cluster} {turns[i][0]:.2f}s: best salesperson score {score:.4f}")
+            evidence[cluster].append((rep_of[i], abs(score - matcher.threshold) >= CONFIDENCE_MARGIN))
+
+    per_cluster = defaultdict(int)
+    probes = []
+    for i, (_, _, cluster) in enumerate(turns):
+        if per_cluster[cluster] < CONFIDENT_TURNS:
+            probes.append(i)
+            per_cluster[cluster] += 1
+    embed(probes)
+
+    settled = {}
+    for cluster, decisions in evidence.items():
+        if (len(decisions) >= CONFIDENT_TURNS and all(confident for _, confident in decisions)
+                and len({decision for decision, _ in decisions}) == 1):
+            settled[cluster] = decisions[0][0]
+            print(f"[LABEL] {cluster} settled as {matcher.label(settled[cluster]) if settled[cluster] >= 0 else 'other speaker'}")
+
+    probed = set(probes)
+    embed([i for i, turn in enumerate(turns) if i not in probed and turn[2] not in settled])
+    embedded = 0
+    for i, (_, _, cluster) in enumerate(turns):
+        if rep_of[i] is None:
+            rep_of[i] = settled[cluster]
+        else:
+            embedded += 1
+    print(f"[EMBEDDING] Embedded {embedded} of {len(turns)} turns")
+
+    # One embedding per cluster for its non-salesperson turns, in order of appearance
+    cluster_vectors = {}
+    for i, (_, _, cluster) in enumerate(turns):
+        if rep_of[i] < 0 and embeddings[i] is not None:
+            cluster_vectors.setdefault(cluster, []).append(embeddings[i])
+    clusters = list(cluster_vectors)
+    cluster_labels = {}
+    if clusters:
+        means = np.stack([normalize_rows(cluster_vectors[c]).mean(axis=0) for c in clusters])
+        weights = [len(cluster_vectors[c]) for c in clusters]
+        cluster_labels = dict(zip(clusters, speaker_registry.assign(means, weights)))
+
+    labels = []
+    for i, (_, _, cluster) in enumerate(turns):
+        labels.append(matcher.label(rep_of[i]) if rep_of[i] >= 0 else cluster_labels.get(cluster, cluster))
+    return labels
+
+
+def label_clusters(waveform: torch.Tensor, turns: list, cluster_embeddings: dict, reference, speaker_registry: SpeakerRegistry) -> list:
+    """
+    Label (start, end, cluster) turns from one embedding per diarization cluster.
+
+    `cluster_embeddings` are the diarization pipeline's centroids; clusters without
+    one are embedded from up to CLUSTER_EMBEDDING_SECONDS of their own turns. All
+    clusters are matched against the enrolled reps in one matmul, and the
+    non-salesperson clusters against the registry, so nothing is embedded per turn.
+    `reference` must be in the pyannote embedding space.
+    """
+    matcher = as_salesperson_matcher(reference)
+    clusters = list(dict.fromkeys(cluster for _, _, cluster in turns))
+    if not clusters:
+        return []
+
+    vectors = []
+    for cluster in clusters:
+        vector = cluster_embeddings.get(cluster)
+        if vector is None:
+            spans, total = [], 0.0
+            # Longest turns first
+            for start, end, _ in sorted((t for t in turns if t[2] == cluster), key=lambda t: t[0] - t[1]):
+                if total >= CLUSTER_EMBEDDING_SECONDS:
+                    break
+                spans.append(slice_turn(waveform, start, end))
+                total += end - start
+            print(f"[EMBEDDING] No pipeline centroid for {cluster}, embedding {total:.1f}s of its turns")
+            vector = embed_waveform_with_pyannote(torch.cat(spans))
+        vectors.append(vector)
+    matrix = np.stack(vectors)
+    if matrix.shape[1] != matcher.matrix.shape[1]:
+        raise ValueError(
+            f"Salesperson references have {matcher.matrix.shape[1]} dims, cluster embeddings {matrix.shape[1]}; "
+            f"build the matcher in the {SPEAKER_EMBEDDING_SOURCE} space"
+        )
+
+    reps, scores = matcher.match(matrix)
+    for cluster, score in zip(clusters, scores):
+        print(f"[SIMILARITY] {cluster}: best salesperson score {score:.4f}")
+
+    turn_counts = defaultdict(int)
+    for _, _, cluster in turns:
+        turn_counts[cluster] += 1
+    cluster_labels = {cluster: matcher.label(int(rep)) for cluster, rep in zip(clusters, reps) if rep >= 0}
+    others = [i for i, rep in enumerate(reps) if rep < 0]
+    if others:
+        assigned = speaker_registry.assign(matrix[others], [turn_counts[clusters[i]] for i in others])
+        cluster_labels.update({clusters[i]: label for i, label in zip(others, assigned)})
+    print(f"[EMBEDDING] Labelled {len(turns)} turns from {len(clusters)} cluster embeddings")
+
+    return [cluster_labels[cluster] for _, _, cluster in turns]
+
+
+def diarization_turns(diarization) -> list:
+    """(start, end, cluster) turns long enough to label and transcribe, by start time."""
+    turns = []
     for turn, _, speaker in diarization.itertracks(yield_label=True):
         duration = turn.end - turn.start
-        if duration < 0.5:
-            segment_duration = turn.end - turn.start
-            print(f"[SKIP] Segment too short ({segment_duration:.2f}s)skipping.")
+        if duration < MIN_TURN_DURATION:
+            print(f"[SKIP] Segment too short ({duration:.2f}s)skipping.")
             continue
+        turns.append((turn.start, turn.end, speaker))
+    turns.sort(key=lambda item: item[0])
+    return turns
+
 
-        print(f"[SEGMENT] Speaker: {speaker}, Time: {turn.start:.2f}s - {turn.end:.2f}s")
-        segment = audio[turn.start * 1000: turn.end * 1000]
-        temp_path = f"temp_{speaker}_{turn.start:.2f}.wav"
-        segment.export(temp_path, format="wav")
+def label_speakers(waveform: torch.Tensor, turns: list, ref_embedding, speaker_registry: SpeakerRegistry,
+                   cluster_embeddings: dict = None) -> list:
+    """Speaker label of each turn: per cluster with `cluster_embeddings`, else per turn with ECAPA."""
+    if cluster_embeddings is not None:
+        return label_clusters(waveform, turns, cluster_embeddings, ref_embedding, speaker_registry)
+    return label_turns(waveform, turns, ref_embedding, speaker_registry)
 
-        segment_embedding = get_segment_embedding(temp_path)
-        speaker_label, counter = identify_speaker(segment_embedding, ref_embedding, speaker, unknown_speakers, counter)
-        text = transcribe_audio(temp_path)
 
+def transcribe_turns(waveform: torch.Tensor, turns: list, single_pass: bool = None, meeting_id: str = None) -> list:
+    """Text of each turn."""
+    if single_pass is None:
+        single_pass = SINGLE_PASS_ASR
+    if single_pass:
+        print(f"[ASR] Single-pass transcription of {waveform.shape[0] / SAMPLE_RATE:.1f}s of audio")
+        words = transcribe_words(waveform.numpy(), meeting_id)
+        return assign_words_to_turns(words, [turn[:2] for turn in turns])
+    if WHISPER_BATCH_ENABLED:
+        # All turns are queued at once and decoded in padded batches
+        return get_batched_transcriber(BATCH_WHISPER_MODEL, "final").transcribe_many(
+            [slice_turn(waveform, start, end).numpy() for start, end, _ in turns], meeting_id=meeting_id
+        )
+    return [transcribe_audio(slice_turn(waveform, start, end).numpy(), meeting_id) for start, end, _ in turns]
+
+
+def build_segments(turns: list, labels: list, texts: list) -> list:
+    results = []
+    for (start, end, speaker), speaker_label, text in zip(turns, labels, texts):
+        print(f"[SEGMENT] Speaker: {speaker} -> {speaker_label}, Time: {start:.2f}s - {end:.2f}s")
         results.append({
             "speaker": speaker_label,
-            "start": round(turn.start, 2),
-            "end": round(turn.end, 2),
+            "start": round(start, 2),
+            "end": round(end, 2),
             "text": text
         })
+    return results
+
+
+def process_segments(diarization, audio, ref_embedding, single_pass: bool = None, speaker_registry: SpeakerRegistry = None,
+                     cluster_embeddings: dict = None, meeting_id: str = None):
+    """
+    Label and transcribe diarization turns.
+
+    `audio` is a file path or the mono 16 kHz float32 array from audio_io.
+    `ref_embedding` is the salesperson's reference embedding, or a
+    SalespersonMatcher holding every enrolled rep of the organization. Pass the
+    meeting's `speaker_registry` to keep speaker labels consistent across its
+    recordings; a fresh one is used otherwise. With `cluster_embeddings` from
+    run_diarization(return_embeddings=True), speakers are labelled per cluster
+    (label_clusters) instead of per turn with ECAPA. `meeting_id` selects the
+    pinned language for decoding. Returns a list of {speaker, start, end, text} dicts.
+
+    Runs both steps on the calling thread; transcribe_recording runs them on
+    their own ML pools instead.
+    """
+    if single_pass is None:
+        single_pass = SINGLE_PASS_ASR
+    if speaker_registry is None:
+        speaker_registry = SpeakerRegistry()
+    waveform = load_audio_tensor(audio)
+    turns = diarization_turns(diarization)
+
+    audio_seconds = waveform.shape[0] / SAMPLE_RATE
+    with stage("speaker_labelling", audio_seconds=audio_seconds) as span:
+        labels = label_speakers(waveform, turns, ref_embedding, speaker_registry, cluster_embeddings)
+        span["turns"] = len(turns)
 
-        os.remove(temp_path)
+    with stage("asr", audio_seconds=audio_seconds) as span:
+        texts = transcribe_turns(waveform, turns, single_pass, meeting_id)
+        span["singlePass"] = single_pass
 
-    return results
\ No newline at end of file
+    return build_segments(turns, labels, texts)
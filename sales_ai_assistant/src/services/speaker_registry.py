@@ -0,0 +1,117 @@
+import os
+import numpy as np
+
+# Per-meeting registry of unknown (non-salesperson) speakers. Each speaker keeps a
+# centroid embedding, so "Speaker 1" in one recording of a meeting stays
+# "Speaker 1" in the next recording instead of being renumbered.
+
+# "pyannote": label speakers with the cluster centroids the diarization pipeline
+# already computes, one salesperson match per cluster. "ecapa": embed every turn
+# with ECAPA and match turn by turn. Enrolled references must be in the same space.
+SPEAKER_EMBEDDING_SOURCE = os.getenv("SPEAKER_EMBEDDING_SOURCE", "pyannote")
+
+# Cosine similarity a cluster needs to join a known speaker, per embedding space;
+# SPEAKER_MATCH_THRESHOLD overrides every space. ECAPA keeps the 0.6 the
+# registry was tuned with. The WeSpeaker vectors of the diarization pipeline score
+# lower for the same speaker: speaker-diarization-3.1 itself merges clusters
+# whose centroids are within cosine distance 0.7046 (similarity 0.30), and the
+# registry compares the same kind of centroids, so it uses that cut rounded up.
+SPEAKER_MATCH_THRESHOLDS = {
+    "ecapa": float(os.getenv("SPEAKER_MATCH_THRESHOLD", "0.6")),
+    "pyannote": float(os.getenv("SPEAKER_MATCH_THRESHOLD", "0.3")),
+}
+SPEAKER_MATCH_THRESHOLD = SPEAKER_MATCH_THRESHOLDS[SPEAKER_EMBEDDING_SOURCE]
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-10)
+
+
+class SpeakerRegistry:
+    def __init__(self, threshold: float = SPEAKER_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self.labels = []
+        self.counts = []
+        self.centroids = None  # (num_speakers, dim), rows L2-normalised
+
+    def __len__(self):
+        return len(self.labels)
+
+    def similarities(self, embeddings: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every embedding against every centroid, in one matmul."""
+        embeddings = normalize_rows(embeddings)
+        if self.centroids is None:
+            return np.zeros((len(embeddings), 0), dtype=np.float32)
+        return embeddings @ self.centroids.T
+
+    def _add(self, embedding: np.ndarray, weight: int) -> str:
+        label = f"Speaker {len(self.labels) + 1}"
+        row = normalize_rows(embedding)
+        self.centroids = row if self.centroids is None else np.vstack([self.centroids, row])
+        self.labels.append(label)
+        self.counts.append(weight)
+        return label
+
+    def _update(self, index: int, embedding: np.ndarray, weight: int):
+        # Running mean of normalised embeddings, weighted by how many turns each holds
+        total = self.counts[index] + weight
+        merged = self.centroids[index] * self.counts[index] + normalize_rows(embedding)[0] * weight
+        self.centroids[index] = normalize_rows(merged)[0]
+        self.counts[index] = total
+
+    def assign(self, embeddings: np.ndarray, weights: list = None) -> list:
+        """
+        Assign a label to each embedding (typically one per diarization cluster).
+
+        Similarities against all known speakers are computed at once; pairs are then
+        matched greedily from the highest score, one embedding per speaker, and
+        embeddings left without a match above the threshold become new speakers.
+        """
+        embeddings = normalize_rows(embeddings)
+        weights = weights or [1] * len(embeddings)
+        if self.centroids is not None and self.centroids.shape[1] != embeddings.shape[1]:
+            # Speakers were stored in another embedding space (SPEAKER_EMBEDDING_SOURCE changed)
+            print(f"[REGISTRY] Embedding size changed from {self.centroids.shape[1]} to {embeddings.shape[1]}, starting over")
+            self.restore({"threshold": self.threshold})
+        sims = self.similarities(embeddings)
+        labels = [None] * len(embeddings)
+
+        used = set()
+        for flat in np.argsort(-sims, axis=None):
+            i, j = np.unravel_index(flat, sims.shape)
+            if sims[i, j] < self.threshold:
+                break
+            if labels[i] is not None or j in used:
+                continue
+            labels[i] = self.labels[j]
+            used.add(j)
+            self._update(j, embeddings[i], weights[i])
+
+        for i, embedding in enumerate(embeddings):
+            if labels[i] is None:
+                labels[i] = self._add(embedding, weights[i])
+        return labels
+
+    def to_dict(self) -> dict:
+        return {
+            "threshold": self.threshold,
+            "labels": list(self.labels),
+            "counts": list(self.counts),
+            "centroids": self.centroids.tolist() if self.centroids is not None else [],
+        }
+
+    def restore(self, data: dict = None):
+        """Replace this registry's state with a to_dict() snapshot, in place."""
+        data = data or {}
+        self.threshold = data.get("threshold", self.threshold)
+        self.labels = list(data.get("labels", []))
+        self.counts = list(data.get("counts", []))
+        self.centroids = normalize_rows(data["centroids"]) if data.get("centroids") else None
+
+    @classmethod
+    def from_dict(cls, data: dict = None):
+        registry = cls()
+        registry.restore(data)
+        return registry
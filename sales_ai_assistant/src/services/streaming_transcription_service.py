@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+import numpy as np
+from src.services.model_registry import get_model
+from src.services.audio_io import decode_audio_bytes
+from src.services.vad_service import remove_silence
+from src.services.decoding_profiles import DECODING_PROFILES, get_meeting_language, remember_language
+
+# Incremental transcription of live chunk uploads. Each meeting keeps a short
+# rolling buffer of not-yet-committed audio; on every chunk the buffer is
+# transcribed, words that end before the trailing overlap window are committed
+# and the audio up to the last committed word is dropped. The meeting's pinned
+# language and the tail of the committed text are carried into the next call.
+
+WHISPER_MODEL = "faster_whisper_large_int8"
+SAMPLE_RATE = 16000
+
+# Audio at the end of the buffer whose words are not committed yet, because the
+# next chunk may still change them.
+STREAM_OVERLAP_SECONDS = float(os.getenv("STREAM_OVERLAP_SECONDS", "2.0"))
+# Do not run Whisper until the buffer holds at least this much audio.
+STREAM_MIN_SECONDS = float(os.getenv("STREAM_MIN_SECONDS", "1.0"))
+# Upper bound on the buffer; beyond it all words but the last are committed.
+STREAM_MAX_BUFFER_SECONDS = float(os.getenv("STREAM_MAX_BUFFER_SECONDS", "30.0"))
+# Streams without chunks for this long are dropped.
+STREAM_IDLE_TIMEOUT_SECONDS = float(os.getenv("STREAM_IDLE_TIMEOUT_SECONDS", "1800"))
+PROMPT_CHARS = 200
+
+
+class StreamingTranscriber:
+    def __init__(self, meeting_id: str):
+        self.meeting_id = meeting_id
+        self.buffer = np.zeros(0, dtype=np.float32)
+        # Position of buffer[0] on the meeting timeline, in seconds
+        self.buffer_offset = 0.0
+        self.committed_text = ""
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _transcribe_buffer(self) -> list:
+        """Transcribe the speech in the buffer; word times are seconds into the buffer."""
+        speech, timeline = remove_silence(self.buffer)
+        if len(speech) == 0:
+            return []
+
+        model = get_model(WHISPER_MODEL)
+        language = get_meeting_language(self.meeting_id)
+        segments, info = model.transcribe(
+            speech,
+            **DECODING_PROFILES["live"],
+            language=language,
+            initial_prompt=self.committed_text[-PROMPT_CHARS:] or None,
+            word_timestamps=True,
+        )
+        words = [
+            {
+                "word": word.word,
+                "start": timeline.to_original(word.start),
+                "end": timeline.to_original(word.end, is_end=True),
+            }
+            for segment in segments for word in (segment.words or [])
+        ]
+        if language is None:
+            remember_language(self.meeting_id, info.language, info.language_probability)
+        return words
+
+    def _commit(self, words, until: float) -> str:
+        """Commit words ending before `until` (buffer seconds) and drop their audio."""
+        stable = [word for word in words if word["end"] <= until]
+        if stable:
+            cut = stable[-1]["end"]
+        elif not words:
+            # Nothing but silence: keep only the overlap window
+            cut = max(len(self.buffer) / SAMPLE_RATE - STREAM_OVERLAP_SECONDS, 0.0)
+        else:
+            return ""
+
+        self.buffer = self.buffer[int(cut * SAMPLE_RATE):]
+        self.buffer_offset += cut
+        text = "".join(word["word"] for word in stable).strip()
+        if text:
+            self.committed_text = f"{self.committed_text} {text}".strip()
+        return text
+
+    def push(self, pcm: np.ndarray) -> str:
+        """Append a chunk of 16 kHz samples and return the newly committed text."""
+        with self.lock:
+            self.last_used = time.monotonic()
+            self.buffer = np.concatenate([self.buffer, pcm.astype(np.float32, copy=False)])
+            duration = len(self.buffer) / SAMPLE_RATE
+            if duration < STREAM_MIN_SECONDS:
+                return ""
+
+            words = self._transcribe_buffer()
+            until = duration - STREAM_OVERLAP_SECONDS
+            text = self._commit(words, until)
+            if not text and words and duration > STREAM_MAX_BUFFER_SECONDS:
+                # Buffer full without a stable word: commit all but the last word
+                text = self._commit(words[:-1] or words, duration)
+            return text
+
+    def flush(self) -> str:
+        """Commit whatever is left in the buffer."""
+        with self.lock:
+            if len(self.buffer) == 0:
+                return ""
+            words = self._transcribe_buffer()
+            return self._commit(words, len(self.buffer) / SAMPLE_RATE)
+
+
+_streams = {}
+_streams_lock = threading.Lock()
+
+
+def _evict_idle_streams():
+    now = time.monotonic()
+    for meeting_id in [m for m, s in _streams.items() if now - s.last_used > STREAM_IDLE_TIMEOUT_SECONDS]:
+        print(f"[STREAM] Dropping idle stream {meeting_id}")
+        _streams.pop(meeting_id, None)
+
+
+def get_streaming_transcriber(meeting_id: str) -> StreamingTranscriber:
+    with _streams_lock:
+        _evict_idle_streams()
+        stream = _streams.get(meeting_id)
+        if stream is None:
+            stream = StreamingTranscriber(meeting_id)
+            _streams[meeting_id] = stream
+        return stream
+
+
+def push_audio_chunk(meeting_id: str, audio) -> str:
+    """
+    Feed a chunk to the meeting's stream; returns the newly committed text.
+
+    `audio` is the encoded upload or its already-ingested 16 kHz samples.
+    """
+    if isinstance(audio, (bytes, bytearray)):
+        audio = decode_audio_bytes(audio)
+    return get_streaming_transcriber(meeting_id).push(audio)
+
+
+def finish_stream(meeting_id: str, flush: bool = True) -> str:
+    """Drop the meeting's stream, flushing it first unless `flush` is False."""
+    with _streams_lock:
+        stream = _streams.pop(meeting_id, None)
+    return stream.flush() if stream and flush else ""
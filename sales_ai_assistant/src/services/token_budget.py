@@ -0,0 +1,93 @@
+import re
+
+from src.services.model_registry import get_model, LLM_CONTEXT_TOKENS
+
+# Prompt sizes measured with the LLM's own tokenizer. Counting uses a separate
+# vocabulary-only instance, so it never waits for the inference thread.
+#
+# A prompt must leave room for the answer: fit_content() reserves max_tokens for
+# it and cuts the variable content to what is left, always the same way for the
+# same input. Filler words go first, then whole lines (turns) from the oldest
+# end, then the tokens of the one line left.
+
+LLM_TOKENIZER = "mistral_7b_tokenizer"
+# Tokens of an instruction prompt besides its content: [INST] markers, the
+# instruction itself and a margin for tokenizing pieces separately
+PROMPT_OVERHEAD_TOKENS = 200
+# Kept free in a measured prompt: the BOS token and slack for counting the
+# prompt in pieces
+SAFETY_MARGIN_TOKENS = 16
+
+_FILLER = re.compile(r"\b(?:u+m+|u+h+m*|e+r+m+|h+m+|mhm)\b[,.]?\s*|\b(?:you know|I mean),\s*", re.IGNORECASE)
+_REPEATED_WORD = re.compile(r"\b([A-Za-z]+)(?:\s+\1\b)+", re.IGNORECASE)
+_SPACES = re.compile(r"[ \t]{2,}")
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return len(get_model(LLM_TOKENIZER).tokenize(text.encode("utf-8"), add_bos=False, special=True))
+
+
+def content_budget(max_tokens: int, *fixed: str) -> int:
+    """Tokens left for variable content once the answer and the `fixed` texts are accounted for."""
+    return LLM_CONTEXT_TOKENS - PROMPT_OVERHEAD_TOKENS - max_tokens - sum(count_tokens(text) for text in fixed)
+
+
+def remove_filler(text: str) -> str:
+    """Drop hesitations ("um", "uh", "you know,") and stuttered repeats ("the the")."""
+    text = _FILLER.sub("", text)
+    text = _REPEATED_WORD.sub(r"\1", text)
+    return _SPACES.sub(" ", text)
+
+
+def cut_tokens(text: str, budget: int, keep: str = "end") -> str:
+    """The last (keep="end") or first `budget` tokens of `text`."""
+    tokenizer = get_model(LLM_TOKENIZER)
+    tokens = tokenizer.tokenize(text.encode("utf-8"), add_bos=False, special=True)
+    tokens = tokens[-budget:] if keep == "end" else tokens[:budget]
+    return tokenizer.detokenize(tokens).decode("utf-8", errors="ignore").strip()
+
+
+def trim_to_budget(text: str, budget: int, keep: str = "end") -> str:
+    """
+    `text` in at most `budget` tokens. keep="end" drops the oldest lines first
+    (transcripts), keep="start" the last ones (documents with a header).
+    """
+    if budget <= 0:
+        return ""
+    original = count_tokens(text)
+    if original <= budget:
+        return text
+    text = remove_filler(text)
+    if count_tokens(text) > budget:
+        lines = [line for line in text.splitlines() if line.strip()]
+        if keep == "end":
+            lines.reverse()
+        kept, used = [], 0
+        for line in lines:
+            tokens = count_tokens(line) + 1
+            if used + tokens > budget:
+                if not kept:
+                    kept.append(cut_tokens(line, budget, keep))
+                break
+            kept.append(line)
+            used += tokens
+        if keep == "end":
+            kept.reverse()
+        text = "\n".join(kept)
+    print(f"[LLM] Trimmed prompt content from {original} to {count_tokens(text)} tokens (budget {budget})")
+    return text
+
+
+def fit_content(content: str, max_tokens: int, *fixed: str, keep: str = "end") -> tuple:
+    """
+    (content, max_tokens) for a prompt made of the `fixed` texts and `content`
+    that fits the context with room for the answer. max_tokens is only lowered
+    when the fixed texts leave less room than asked for.
+    """
+    available = LLM_CONTEXT_TOKENS - SAFETY_MARGIN_TOKENS - sum(count_tokens(text) for text in fixed)
+    if available <= 0:
+        raise ValueError("The instruction alone does not fit in the LLM context")
+    max_tokens = min(max_tokens, available)
+    return trim_to_budget(content, available - max_tokens, keep), max_tokens
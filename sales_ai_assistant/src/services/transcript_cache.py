@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Optional
+
+# Content-addressed cache of pipeline output. Keys hash the audio samples or bytes
+# together with the model names and every setting that changes the output, so a
+# retry or a repeated call for the same audio skips diarization and ASR. Entries
+# are JSON files on local disk, evicted least-recently-used once the cache grows
+# beyond TRANSCRIPT_CACHE_MAX_BYTES or older than TRANSCRIPT_CACHE_MAX_AGE_SECONDS.
+# Everything here is synchronous so it can be used from the ML worker threads.
+
+TRANSCRIPT_CACHE_ENABLED = os.getenv("TRANSCRIPT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+TRANSCRIPT_CACHE_DIR = os.path.abspath(os.getenv("TRANSCRIPT_CACHE_DIR", "cache/transcripts"))
+TRANSCRIPT_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", str(512 * 2**20)))
+TRANSCRIPT_CACHE_MAX_AGE_SECONDS = int(os.getenv("TRANSCRIPT_CACHE_MAX_AGE_SECONDS", str(30 * 24 * 3600)))
+# Bump when a code change alters pipeline output without changing any setting
+PIPELINE_VERSION = "1"
+
+
+def cache_key(audio, *config) -> str:
+    """Hash audio (bytes or a contiguous numpy array) together with the config values."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(audio)
+    digest.update(json.dumps([PIPELINE_VERSION, *config], sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def _path(key: str) -> str:
+    return os.path.join(TRANSCRIPT_CACHE_DIR, key[:2], f"{key}.json")
+
+
+def get_cached(key: str) -> Optional[object]:
+    if not TRANSCRIPT_CACHE_ENABLED:
+        return None
+    path = _path(key)
+    try:
+        if time.time() - os.path.getmtime(path) > TRANSCRIPT_CACHE_MAX_AGE_SECONDS:
+            os.remove(path)
+            return None
+        with open(path) as f:
+            value = json.load(f)
+        os.utime(path)  # mark as recently used
+        print(f"[CACHE] Hit {key}")
+        return value
+    except (OSError, ValueError):
+        return None
+
+
+def put_cached(key: str, value) -> None:
+    if not TRANSCRIPT_CACHE_ENABLED:
+        return
+    path = _path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(value, f)
+    os.replace(tmp_path, path)  # atomic, readers never see a partial entry
+    evict()
+
+
+def evict() -> None:
+    """Drop expired entries, then the least recently used until under the size limit."""
+    entries = []
+    now = time.time()
+    for root, _, files in os.walk(TRANSCRIPT_CACHE_DIR):
+        for name in files:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+                if now - stat.st_mtime > TRANSCRIPT_CACHE_MAX_AGE_SECONDS:
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= TRANSCRIPT_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
@@ -0,0 +1,122 @@
+import asyncio
+import math
+import os
+import re
+
+from src.services.prediction_models_service import run_instruction_async
+from src.services.token_budget import count_tokens
+
+# Map-reduce condensing of transcripts too long for one prompt. The transcript is
+# split on speaker-turn boundaries into windows of at most LLM_MAP_WINDOW_TOKENS
+# (a turn longer than a window is split on sentences, then words), each window is
+# turned into notes, and the notes are merged window by window until they fit
+# the budget of the final prompts. All windows of a round are queued at once;
+# the LLM service runs them back to back on its inference thread.
+#
+# Windows start at the beginning of the transcript, so a transcript that grew
+# since the last run gives the same first windows and their notes come from the
+# answer cache.
+
+LLM_MAP_WINDOW_TOKENS = int(os.getenv("LLM_MAP_WINDOW_TOKENS", "2000"))
+LLM_MAP_MAX_TOKENS = int(os.getenv("LLM_MAP_MAX_TOKENS", "300"))
+
+MAP_INSTRUCTION = (
+    "Write concise notes on this part of a meeting transcript. Keep speaker names and cover the topics "
+    "discussed, questions asked, decisions, action items with owners and due dates, dates and times "
+    "mentioned, and the tone of each speaker"
+)
+REDUCE_INSTRUCTION = (
+    "Merge these consecutive partial notes of one meeting into a single set of concise notes. Keep speaker "
+    "names, decisions, action items with owners and due dates, dates and times, and the tone of each speaker"
+)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_turn(turn: str, budget: int) -> list:
+    """Pieces of one "Speaker: text" turn of at most `budget` tokens, each keeping the speaker."""
+    if count_tokens(turn) <= budget:
+        return [turn]
+    speaker, separator, text = turn.partition(": ")
+    if not separator or len(speaker) > 60:
+        speaker, text = "", turn
+    label = f"{speaker}: " if speaker else ""
+    budget -= count_tokens(label)
+
+    pieces = []
+    for sentence in _SENTENCE_END.split(text):
+        tokens = count_tokens(sentence)
+        if tokens <= budget:
+            pieces.append(sentence)
+            continue
+        words = sentence.split()
+        parts = math.ceil(tokens / budget)
+        step = math.ceil(len(words) / parts)
+        pieces.extend(" ".join(words[i:i + step]) for i in range(0, len(words), step))
+    return [f"{label}{piece}" for piece in pack(pieces, budget, separator=" ")]
+
+
+def pack(items: list, budget: int, separator: str = "\n") -> list:
+    """Join consecutive items greedily into strings of at most `budget` tokens."""
+    windows, current, used = [], [], 0
+    for item in items:
+        tokens = count_tokens(item) + 1
+        if current and used + tokens > budget:
+            windows.append(separator.join(current))
+            current, used = [], 0
+        current.append(item)
+        used += tokens
+    if current:
+        windows.append(separator.join(current))
+    return windows
+
+
+def split_windows(transcript: str, budget: int = LLM_MAP_WINDOW_TOKENS) -> list:
+    """Consecutive speaker turns (one per line) packed into windows of at most `budget` tokens."""
+    turns = [piece for line in transcript.splitlines() if line.strip() for piece in split_turn(line.strip(), budget)]
+    return pack(turns, budget)
+
+
+async def _run_all(instruction: str, contents: list, request=None, use_cache: bool = True) -> list:
+    tasks = [
+        asyncio.ensure_future(run_instruction_async(instruction, content, max_tokens=LLM_MAP_MAX_TOKENS,
+                                                    request=request, use_cache=use_cache))
+        for content in contents
+    ]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        # Drop the jobs still queued for this transcript
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+async def condense_transcript(transcript: str, budget: int, request=None, use_cache: bool = True) -> str:
+    """Notes of `transcript` that fit in `budget` tokens."""
+    window = min(LLM_MAP_WINDOW_TOKENS, budget)
+    windows = await asyncio.to_thread(split_windows, transcript, window)
+    notes = await _run_all(MAP_INSTRUCTION, windows, request, use_cache)
+    print(f"[SUMMARY] Condensed {len(windows)} transcript window(s) into notes")
+
+    text = "\n\n".join(notes)
+    while await asyncio.to_thread(count_tokens, text) > budget and len(notes) > 1:
+        groups = await asyncio.to_thread(pack, notes, window, "\n\n")
+        if len(groups) == len(notes):
+            # Every note fills a window on its own; merge them pairwise
+            groups = ["\n\n".join(notes[i:i + 2]) for i in range(0, len(notes), 2)]
+        notes = await _run_all(REDUCE_INSTRUCTION, groups, request, use_cache)
+        text = "\n\n".join(notes)
+        print(f"[SUMMARY] Merged notes into {len(notes)} part(s)")
+    return text
+
+
+async def fit_transcript(transcript: str, budget: int, request=None, use_cache: bool = True) -> tuple:
+    """
+    The transcript itself if it fits in `budget` tokens, else its condensed notes.
+
+    Returns (text, condensed).
+    """
+    if await asyncio.to_thread(count_tokens, transcript) <= budget:
+        return transcript, False
+    return await condense_transcript(transcript, budget, request, use_cache), True
@@ -1,30 +1,74 @@
-from faster_whisper import WhisperModel
-import tempfile
-import os
+from src.services.model_registry import get_model
+from src.services.audio_io import decode_audio_bytes
+from src.services.vad_service import remove_silence, vad_config
+from src.services.transcript_cache import cache_key, get_cached, put_cached
+from src.services.batched_transcription_service import WHISPER_BATCH_ENABLED, get_batched_transcriber
+from src.services.decoding_profiles import DECODING_PROFILES, decoding_options, remember_language
+from src.services.ml_executor import run_in_ml_pool
 
-# Load the model once
-model = WhisperModel("large", compute_type="int8")
+# faster-whisper "large" int8, loaded on first use by the model registry
+WHISPER_MODEL = "faster_whisper_large_int8"
 
-def transcribe_audio_bytes(audio_bytes: bytes) -> str:
-    # Use delete=False to avoid PermissionError on Windows
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-        tmp.write(audio_bytes)
-        tmp.flush()
-        tmp_path = tmp.name  # Store path so we can use and delete it later
 
-    try:
-        segments, _ = model.transcribe(tmp_path)
+def _transcript_key(audio_bytes: bytes) -> str:
+    # Same bytes with the same model and settings give the same text
+    return cache_key(
+        audio_bytes, "transcribe_audio_bytes", WHISPER_MODEL, vad_config(), WHISPER_BATCH_ENABLED, DECODING_PROFILES["live"]
+    )
 
-        full_text = ""
+
+def _speech_from_bytes(audio_bytes: bytes):
+    # Decode in memory and hand Whisper the PCM array, no temp file
+    audio, _ = remove_silence(decode_audio_bytes(audio_bytes))
+    return audio
+
+
+def transcribe_audio_bytes(audio_bytes: bytes, meeting_id: str = None) -> str:
+    """Transcribe a live chunk with the "live" decoding profile and the meeting's pinned language."""
+    key = _transcript_key(audio_bytes)
+    cached = get_cached(key)
+    if cached is not None:
+        return cached["text"]
+
+    audio = _speech_from_bytes(audio_bytes)
+    full_text = ""
+    if len(audio) > 0 and WHISPER_BATCH_ENABLED:
+        # Shares encoder/decoder batches with concurrent callers
+        full_text = get_batched_transcriber(WHISPER_MODEL, "live").transcribe(audio, meeting_id=meeting_id)
+    elif len(audio) > 0:
+        options = decoding_options("live", meeting_id)
+        segments, info = get_model(WHISPER_MODEL).transcribe(audio, **options)
         for segment in segments:
             full_text += segment.text.strip() + " "
+        if options["language"] is None:
+            remember_language(meeting_id, info.language, info.language_probability)
+
+    put_cached(key, {"text": full_text.strip()})
+    return full_text.strip()
+
+
+async def transcribe_audio_bytes_async(audio_bytes: bytes, meeting_id: str = None) -> str:
+    """
+    transcribe_audio_bytes for request handlers.
+
+    With batching on, decoding and VAD run on the audio pool and the request then
+    waits on the batched decoder without holding a worker thread, so chunks from
+    many meetings can share a batch.
+    """
+    if not WHISPER_BATCH_ENABLED:
+        return await run_in_ml_pool("whisper", transcribe_audio_bytes, audio_bytes, meeting_id)
+
+    key = await run_in_ml_pool("audio", _transcript_key, audio_bytes)
+    cached = await run_in_ml_pool("audio", get_cached, key)
+    if cached is not None:
+        return cached["text"]
 
-        return full_text.strip()
+    audio = await run_in_ml_pool("audio", _speech_from_bytes, audio_bytes)
+    transcriber = get_batched_transcriber(WHISPER_MODEL, "live")
+    full_text = await transcriber.transcribe_async(audio, meeting_id=meeting_id) if len(audio) > 0 else ""
 
-    finally:
-        # Manually delete the temp file
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
+    await run_in_ml_pool("audio", put_cached, key, {"text": full_text.strip()})
+    return full_text.strip()
 
 
 
@@ -36,6 +80,6 @@ def transcribe_audio_bytes(audio_bytes: bytes) -> str:
 #     return model
 
 def transcribe_segment(audio_path):
-    result = model.transcribe(audio_path)
+    result = get_model(WHISPER_MODEL).transcribe(audio_path)
     text = result.get("text", "").strip()
     return text
@@ -0,0 +1,92 @@
+import bisect
+import os
+import numpy as np
+
+# Voice-activity pre-filtering. Non-speech regions (silence, hold music, the Meet
+# bot's waiting room) are cut out before diarization and ASR; SpeechTimeline maps
+# timestamps on the compacted audio back to the original recording.
+
+SAMPLE_RATE = 16000
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() in ("1", "true", "yes")
+VAD_THRESHOLD = float(os.getenv("VAD_THRESHOLD", "0.5"))
+# Silences shorter than this stay in the audio, so turn-taking pauses are kept.
+VAD_MIN_SILENCE_MS = int(os.getenv("VAD_MIN_SILENCE_MS", "1000"))
+VAD_SPEECH_PAD_MS = int(os.getenv("VAD_SPEECH_PAD_MS", "300"))
+# Skip compaction when it would remove less than this fraction of the audio.
+VAD_MIN_REMOVED_FRACTION = 0.05
+
+
+def vad_config() -> list:
+    """Settings that change VAD output, for cache keys."""
+    return [VAD_ENABLED, VAD_THRESHOLD, VAD_MIN_SILENCE_MS, VAD_SPEECH_PAD_MS, VAD_MIN_REMOVED_FRACTION]
+
+
+class SpeechTimeline:
+    """Maps positions in compacted (speech-only) audio back to the original audio."""
+
+    def __init__(self, regions: list, sample_rate: int = SAMPLE_RATE):
+        # regions: (start, end) sample indices of the kept speech in the original audio
+        self.regions = regions
+        self.sample_rate = sample_rate
+        self.compact_starts = []
+        offset = 0
+        for start, end in regions:
+            self.compact_starts.append(offset)
+            offset += end - start
+        self.compact_length = offset
+
+    @classmethod
+    def identity(cls, num_samples: int, sample_rate: int = SAMPLE_RATE):
+        return cls([(0, num_samples)] if num_samples else [], sample_rate)
+
+    def to_original(self, seconds: float, is_end: bool = False) -> float:
+        """
+        Convert a time on the compacted audio to the original timeline.
+
+        A time exactly on the seam between two regions maps to the end of the earlier
+        region when `is_end` is set, otherwise to the start of the later one.
+        """
+        if not self.regions:
+            return seconds
+        sample = seconds * self.sample_rate
+        search = bisect.bisect_left if is_end else bisect.bisect_right
+        i = max(search(self.compact_starts, sample) - 1, 0)
+        start, end = self.regions[i]
+        original = start + (sample - self.compact_starts[i])
+        return min(original, end) / self.sample_rate
+
+    def removed_seconds(self, total_samples: int) -> float:
+        return (total_samples - self.compact_length) / self.sample_rate
+
+
+def detect_speech(audio: np.ndarray) -> list:
+    """Return (start, end) sample indices of speech regions, using Silero VAD."""
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    options = VadOptions(
+        threshold=VAD_THRESHOLD,
+        min_silence_duration_ms=VAD_MIN_SILENCE_MS,
+        speech_pad_ms=VAD_SPEECH_PAD_MS,
+    )
+    return [(ts["start"], ts["end"]) for ts in get_speech_timestamps(audio, options)]
+
+
+def remove_silence(audio: np.ndarray):
+    """
+    Drop non-speech regions from a mono 16 kHz array.
+
+    Returns (speech_audio, timeline). When VAD is disabled or would remove almost
+    nothing, the audio is returned unchanged with an identity timeline.
+    """
+    if not VAD_ENABLED or len(audio) == 0:
+        return audio, SpeechTimeline.identity(len(audio))
+
+    regions = detect_speech(audio)
+    kept = sum(end - start for start, end in regions)
+    if regions and kept >= len(audio) * (1 - VAD_MIN_REMOVED_FRACTION):
+        return audio, SpeechTimeline.identity(len(audio))
+
+    timeline = SpeechTimeline(regions)
+    speech = np.concatenate([audio[start:end] for start, end in regions]) if regions else audio[:0]
+    print(f"[VAD] Kept {kept / SAMPLE_RATE:.1f}s of speech, removed {timeline.removed_seconds(len(audio)):.1f}s")
+    return speech, timeline
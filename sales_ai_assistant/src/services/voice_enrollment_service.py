@@ -0,0 +1,162 @@
+import asyncio
+from typing import Optional
+import numpy as np
+
+from src.services.s3_service import upload_file_to_s3, download_file_from_s3
+from src.services.speaker_identification import (
+    compute_centroid,
+    load_reference_embedding,
+    load_reference_embedding_from_bytes,
+    load_pyannote_embedding,
+    load_pyannote_embedding_from_bytes,
+    SPEAKER_EMBEDDING_SOURCE,
+)
+from src.services.mongo_service import (
+    save_salesperson_sample,
+    get_salesperson_samples,
+    set_salesperson_sample_embedding,
+    update_salesperson_centroid,
+    clear_salesperson_centroid,
+    get_salesperson_embedding,
+    get_org_salesperson_embeddings,
+    get_organization_speaker_threshold,
+)
+from src.services.salesperson_matcher import SalespersonMatcher, SALESPERSON_THRESHOLDS
+from src.services.ml_executor import run_in_ml_pool
+from src.utils import extract_filename_from_s3_url
+
+
+# Speaker-embedding spaces: the ECAPA space for per-turn matching, and the
+# diarization pipeline's space for matching its cluster centroids. Each space has
+# its own sample and centroid fields. A new sample is only embedded in the active
+# space (SPEAKER_EMBEDDING_SOURCE); the others are backfilled when first needed.
+EMBEDDING_SPACES = {
+    "ecapa": {
+        "sample_field": "embedding",
+        "centroid_field": "centroid",
+        "pool": "ecapa",
+        "embed_bytes": load_reference_embedding_from_bytes,
+        "embed_path": load_reference_embedding,
+    },
+    "pyannote": {
+        "sample_field": "pyannoteEmbedding",
+        "centroid_field": "pyannoteCentroid",
+        "pool": "pyannote",
+        "embed_bytes": load_pyannote_embedding_from_bytes,
+        "embed_path": load_pyannote_embedding,
+    },
+}
+
+
+async def _embed_legacy_samples(samples: list, space: str = SPEAKER_EMBEDDING_SOURCE) -> list:
+    """Compute and persist embeddings for samples uploaded before enrollment stored them."""
+    config = EMBEDDING_SPACES[space]
+    embeddings = []
+    for sample in samples:
+        if sample.get(config["sample_field"]):
+            embeddings.append(sample[config["sample_field"]])
+            continue
+        if not sample.get("s3_url"):
+            continue
+        print(f"[ENROLL] Backfilling {space} embedding for sample {sample['_id']}")
+        s3_key = extract_filename_from_s3_url(sample["s3_url"])
+        audio_bytes = await asyncio.to_thread(download_file_from_s3, s3_key)
+        embedding = await run_in_ml_pool(config["pool"], config["embed_bytes"], audio_bytes)
+        await set_salesperson_sample_embedding(sample["_id"], embedding.tolist(), field=config["sample_field"])
+        embeddings.append(embedding.tolist())
+    return embeddings
+
+
+async def refresh_salesperson_centroid(userId: str, space: str = SPEAKER_EMBEDDING_SOURCE) -> Optional[np.ndarray]:
+    """Recompute the centroid over every voice sample of the user and store it in salesSamples."""
+    samples = await get_salesperson_samples(userId)
+    embeddings = await _embed_legacy_samples(samples, space)
+    if not embeddings:
+        return None
+    centroid = compute_centroid(embeddings)
+    await update_salesperson_centroid(userId, centroid.tolist(), len(embeddings), field=EMBEDDING_SPACES[space]["centroid_field"])
+    print(f"[ENROLL] {space} centroid for {userId} updated from {len(embeddings)} sample(s)")
+    return centroid
+
+
+async def enroll_salesperson_sample(userId: str, filename: str, content: bytes) -> dict:
+    """Upload a voice sample, embed it in the active space and fold it into the user's centroid."""
+    s3_key = f"salesperson_samples_audio/{userId}_{filename}"
+    s3_url = await asyncio.to_thread(upload_file_to_s3, s3_key, content)
+
+    config = EMBEDDING_SPACES[SPEAKER_EMBEDDING_SOURCE]
+    embedding = await run_in_ml_pool(config["pool"], config["embed_bytes"], content)
+    doc_id = await save_salesperson_sample(
+        filename=filename,
+        s3_url=s3_url,
+        userId=userId,
+        embeddings={config["sample_field"]: embedding.tolist()}
+    )
+    # Centroids of the other spaces no longer cover every sample; drop them so
+    # they are recomputed, with this sample backfilled, when next needed
+    for space, other in EMBEDDING_SPACES.items():
+        if space != SPEAKER_EMBEDDING_SOURCE:
+            await clear_salesperson_centroid(userId, field=other["centroid_field"])
+    centroid = await refresh_salesperson_centroid(userId, SPEAKER_EMBEDDING_SOURCE)
+    samples = await get_salesperson_samples(userId)
+
+    return {
+        "id": doc_id,
+        "s3_url": s3_url,
+        "sample_count": len(samples),
+        "centroid": centroid,
+    }
+
+
+async def get_reference_embedding(userId: str, fallback_path: Optional[str] = None, space: str = SPEAKER_EMBEDDING_SOURCE) -> np.ndarray:
+    """
+    Return the enrolled reference embedding of a salesperson in `space`.
+
+    Reads the stored centroid; if the user only has samples from before enrollment
+    stored vectors in that space, they are embedded once and persisted. `fallback_path`
+    is a local sample used when the user has not enrolled at all.
+    """
+    config = EMBEDDING_SPACES[space]
+    centroid = await get_salesperson_embedding(userId, field=config["centroid_field"]) if userId else None
+    if centroid is not None:
+        return np.asarray(centroid, dtype=np.float32)
+
+    if userId:
+        centroid = await refresh_salesperson_centroid(userId, space)
+        if centroid is not None:
+            return centroid
+
+    if fallback_path:
+        print(f"[ENROLL] No enrolled voice for {userId}, using {fallback_path}")
+        return await run_in_ml_pool(config["pool"], config["embed_path"], fallback_path)
+
+    raise ValueError(f"No salesperson voice sample enrolled for user {userId}")
+
+
+async def get_salesperson_matcher(userId: str, organizationId: Optional[str] = None, fallback_path: Optional[str] = None,
+                                  space: str = SPEAKER_EMBEDDING_SOURCE) -> SalespersonMatcher:
+    """
+    Build a matcher over the meeting owner and every other enrolled rep of the organization.
+
+    The owner's reference comes from get_reference_embedding (so the same fallbacks
+    apply); other reps are only included once they have enrolled in `space`. The
+    threshold is the organization's speakerMatchThreshold when set.
+    """
+    owner = await get_reference_embedding(userId, fallback_path=fallback_path, space=space)
+    embeddings, user_ids, names = [owner], [userId], [None]
+
+    threshold = SALESPERSON_THRESHOLDS[space]
+    if organizationId:
+        for rep in await get_org_salesperson_embeddings(organizationId, field=EMBEDDING_SPACES[space]["centroid_field"]):
+            if rep["userId"] == userId:
+                names[0] = rep["name"]
+                continue
+            embeddings.append(np.asarray(rep["centroid"], dtype=np.float32))
+            user_ids.append(rep["userId"])
+            names.append(rep["name"])
+        org_threshold = await get_organization_speaker_threshold(organizationId)
+        if org_threshold is not None:
+            threshold = org_threshold
+
+    print(f"[ENROLL] Matching against {len(embeddings)} salesperson(s), threshold {threshold}")
+    return SalespersonMatcher(embeddings, user_ids=user_ids, names=names, threshold=threshold)
@@ -1,7 +1,12 @@
-from faster_whisper import WhisperModel
+from src.services.model_registry import get_model
+from src.services.decoding_profiles import decoding_options, remember_language
 
-model = WhisperModel("base")
+WHISPER_MODEL = "faster_whisper_base"
 
-def transcribe_audio(file_path: str) -> str:
-    segments, _ = model.transcribe(file_path)
-    return " ".join([segment.text for segment in segments])
+def transcribe_audio(file_path: str, meeting_id: str = None, profile: str = "final") -> str:
+    options = decoding_options(profile, meeting_id)
+    segments, info = get_model(WHISPER_MODEL).transcribe(file_path, **options)
+    text = " ".join([segment.text for segment in segments])
+    if options["language"] is None:
+        remember_language(meeting_id, info.language, info.language_probability)
+    return text
@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("src.config")
+
+from src.services import llm_response_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(llm_response_cache, "_entries", llm_response_cache.OrderedDict())
+    monkeypatch.setattr(llm_response_cache, "_model_fingerprint", "model.gguf:123")
+
+
+def test_key_is_stable_for_same_prompt_and_params():
+    key = llm_response_cache.response_key(["prefix", "suffix"], max_tokens=300, stop=["</s>"])
+    assert llm_response_cache.response_key(["prefix", "suffix"], stop=["</s>"], max_tokens=300) == key
+
+
+def test_key_changes_with_prompt_params_model_and_version(monkeypatch):
+    key = llm_response_cache.response_key(["prefix", "suffix"], max_tokens=300)
+    assert llm_response_cache.response_key(["prefix", "other"], max_tokens=300) != key
+    assert llm_response_cache.response_key(["prefix", "suffix"], max_tokens=200) != key
+    monkeypatch.setattr(llm_response_cache, "_model_fingerprint", "model.gguf:456")
+    assert llm_response_cache.response_key(["prefix", "suffix"], max_tokens=300) != key
+    monkeypatch.setattr(llm_response_cache, "_model_fingerprint", "model.gguf:123")
+    monkeypatch.setattr(llm_response_cache, "PROMPT_VERSION", "next")
+    assert llm_response_cache.response_key(["prefix", "suffix"], max_tokens=300) != key
+
+
+def test_local_entry_expires_after_ttl(monkeypatch):
+    monkeypatch.setattr(llm_response_cache, "LLM_CACHE_TTL_SECONDS", 60)
+    llm_response_cache.put_local("fresh", "answer")
+    llm_response_cache.put_local("stale", "answer", stored=time.time() - 120)
+    assert llm_response_cache.get_local("fresh") == "answer"
+    assert llm_response_cache.get_local("stale") is None
+    assert "stale" not in llm_response_cache._entries
+
+
+def test_least_recently_used_entry_is_evicted(monkeypatch):
+    monkeypatch.setattr(llm_response_cache, "LLM_CACHE_SIZE", 2)
+    llm_response_cache.put_local("a", "1")
+    llm_response_cache.put_local("b", "2")
+    llm_response_cache.get_local("a")
+    llm_response_cache.put_local("c", "3")
+    assert llm_response_cache.get_local("b") is None
+    assert llm_response_cache.get_local("a") == "1" and llm_response_cache.get_local("c") == "3"
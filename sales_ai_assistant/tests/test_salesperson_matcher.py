@@ -0,0 +1,49 @@
+import numpy as np
+
+from src.services.salesperson_matcher import SalespersonMatcher
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_best_rep_above_threshold_is_matched():
+    matcher = SalespersonMatcher([unit(1, 0, 0), unit(0, 1, 0)], user_ids=["a", "b"], threshold=0.6)
+    reps, scores = matcher.match(np.stack([unit(0.1, 1, 0), unit(1, 0.2, 0)]))
+    assert reps.tolist() == [1, 0]
+    assert np.all(scores > 0.9)
+
+
+def test_score_below_threshold_is_not_a_rep():
+    matcher = SalespersonMatcher([unit(1, 0)], threshold=0.6)
+    close_call = unit(0.55, 0.835)  # cosine 0.55 with the rep
+    reps, scores = matcher.match(np.stack([close_call, unit(0, 1)]))
+    assert reps.tolist() == [-1, -1]
+    assert np.isclose(scores[0], 0.55, atol=1e-3)
+
+
+def test_threshold_decides_the_same_score_differently():
+    embedding = np.stack([unit(0.5, 0.866)])  # cosine 0.5
+    assert SalespersonMatcher([unit(1, 0)], threshold=0.4).match(embedding)[0].tolist() == [0]
+    assert SalespersonMatcher([unit(1, 0)], threshold=0.6).match(embedding)[0].tolist() == [-1]
+
+
+def test_scores_ignore_embedding_scale():
+    matcher = SalespersonMatcher([np.array([3.0, 0.0])], threshold=0.6)
+    reps, scores = matcher.match(np.array([[10.0, 0.0]]))
+    assert reps.tolist() == [0] and np.isclose(scores[0], 1.0)
+
+
+def test_labels():
+    assert SalespersonMatcher.single(unit(1, 0)).label(0) == "Salesperson"
+    matcher = SalespersonMatcher([unit(1, 0), unit(0, 1)], names=["Ana", None])
+    assert matcher.label(0) == "Salesperson (Ana)"
+    assert matcher.label(1) == "Salesperson (2)"
+
+
+def test_fingerprint_changes_with_threshold_and_references():
+    base = SalespersonMatcher([unit(1, 0)], threshold=0.6).fingerprint()
+    assert SalespersonMatcher([unit(1, 0)], threshold=0.6).fingerprint() == base
+    assert SalespersonMatcher([unit(1, 0)], threshold=0.5).fingerprint() != base
+    assert SalespersonMatcher([unit(0, 1)], threshold=0.6).fingerprint() != base
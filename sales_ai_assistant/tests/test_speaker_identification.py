@@ -0,0 +1,33 @@
+import pytest
+
+for module in ("torch", "torchaudio"):
+    pytest.importorskip(module)
+
+from src.services.speaker_identification import assign_words_to_turns
+
+
+def word(start, end, text):
+    return {"start": start, "end": end, "word": text}
+
+
+def test_word_in_turn_goes_to_that_turn():
+    turns = [(0.0, 1.0), (1.0, 2.9), (6.0, 7.0)]
+    words = [word(0.5, 0.7, " a"), word(1.2, 1.4, " b")]
+    assert assign_words_to_turns(words, turns) == ["a", "b", ""]
+
+
+def test_word_in_gap_goes_to_nearest_turn_within_tolerance():
+    turns = [(0.0, 1.0), (1.0, 2.9), (6.0, 7.0)]
+    words = [word(3.0, 3.2, " after"), word(5.6, 5.8, " before"), word(4.3, 4.5, " lost")]
+    assert assign_words_to_turns(words, turns) == ["", "after", "before"]
+
+
+def test_overlapping_turns_gap_word_goes_to_turn_ending_nearest():
+    # The last turn to start ended long ago; the enclosing turn ended 0.2 s before the word
+    turns = [(0.0, 10.0), (1.0, 2.0)]
+    assert assign_words_to_turns([word(10.1, 10.3, " late")], turns) == ["late", ""]
+
+
+def test_overlapping_turns_prefer_turn_containing_word():
+    turns = [(0.0, 10.0), (1.0, 2.0)]
+    assert assign_words_to_turns([word(1.2, 1.4, " x")], turns) == ["", "x"]
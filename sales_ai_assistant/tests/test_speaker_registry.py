@@ -0,0 +1,52 @@
+import numpy as np
+
+from src.services.speaker_registry import SpeakerRegistry
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_new_clusters_become_numbered_speakers():
+    registry = SpeakerRegistry(threshold=0.6)
+    assert registry.assign(np.stack([unit(1, 0, 0), unit(0, 1, 0)])) == ["Speaker 1", "Speaker 2"]
+    assert len(registry) == 2
+
+
+def test_similar_cluster_in_a_later_recording_keeps_its_label():
+    registry = SpeakerRegistry(threshold=0.6)
+    registry.assign(np.stack([unit(1, 0, 0), unit(0, 1, 0)]))
+    assert registry.assign(np.stack([unit(0.1, 1, 0), unit(1, 0.1, 0)])) == ["Speaker 2", "Speaker 1"]
+    assert len(registry) == 2
+
+
+def test_cluster_below_threshold_is_a_new_speaker():
+    registry = SpeakerRegistry(threshold=0.6)
+    registry.assign(np.stack([unit(1, 0)]))
+    # cosine 0.5 with Speaker 1
+    assert registry.assign(np.stack([unit(0.5, 0.866)])) == ["Speaker 2"]
+    assert SpeakerRegistry(threshold=0.4).assign(np.stack([unit(1, 0), unit(0.5, 0.866)])) == ["Speaker 1", "Speaker 2"]
+
+
+def test_each_known_speaker_is_matched_at_most_once():
+    registry = SpeakerRegistry(threshold=0.6)
+    registry.assign(np.stack([unit(1, 0)]))
+    # Both clusters resemble Speaker 1; only the closer one gets the label
+    assert registry.assign(np.stack([unit(1, 0.5), unit(1, 0.05)])) == ["Speaker 2", "Speaker 1"]
+
+
+def test_state_round_trips_through_a_dict():
+    registry = SpeakerRegistry(threshold=0.5)
+    registry.assign(np.stack([unit(1, 0), unit(0, 1)]), weights=[3, 1])
+    restored = SpeakerRegistry.from_dict(registry.to_dict())
+    assert restored.threshold == 0.5
+    assert restored.labels == registry.labels and restored.counts == [3, 1]
+    assert restored.assign(np.stack([unit(0.05, 1)])) == ["Speaker 2"]
+
+
+def test_embedding_size_change_starts_over():
+    registry = SpeakerRegistry(threshold=0.6)
+    registry.assign(np.stack([unit(1, 0, 0)]))
+    assert registry.assign(np.stack([unit(1, 0, 0, 0)])) == ["Speaker 1"]
+    assert registry.centroids.shape == (1, 4)
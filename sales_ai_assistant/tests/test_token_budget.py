@@ -0,0 +1,70 @@
+import pytest
+
+from src.services import model_registry, token_budget
+
+
+class WordTokenizer:
+    """One token per whitespace-separated word, like LlamaTokenizer's API."""
+
+    def tokenize(self, text: bytes, add_bos: bool = False, special: bool = True) -> list:
+        return text.decode("utf-8").split()
+
+    def detokenize(self, tokens: list) -> bytes:
+        return " ".join(tokens).encode("utf-8")
+
+
+@pytest.fixture(autouse=True)
+def word_tokenizer(monkeypatch):
+    original = model_registry._loaders[token_budget.LLM_TOKENIZER]
+    model_registry.register_model(token_budget.LLM_TOKENIZER, WordTokenizer)
+    monkeypatch.setattr(token_budget, "LLM_CONTEXT_TOKENS", 60)
+    monkeypatch.setattr(token_budget, "SAFETY_MARGIN_TOKENS", 0)
+    yield
+    model_registry.register_model(token_budget.LLM_TOKENIZER, original)
+
+
+def transcript(turns: int) -> str:
+    return "\n".join(f"Speaker{i}: we reviewed the plan" for i in range(turns))
+
+
+def test_content_that_fits_is_unchanged():
+    content = transcript(3)
+    assert token_budget.fit_content(content, 20, "instruction here") == (content, 20)
+
+
+def test_oldest_turns_are_dropped_first():
+    content, max_tokens = token_budget.fit_content(transcript(20), 20, "instruction here")
+    assert max_tokens == 20
+    assert content.splitlines()[-1] == "Speaker19: we reviewed the plan"
+    assert "Speaker0:" not in content
+    assert token_budget.count_tokens(content) <= 60 - 20 - 2
+
+
+def test_keep_start_drops_the_last_lines():
+    content, _ = token_budget.fit_content(transcript(20), 20, "instruction here", keep="start")
+    assert content.splitlines()[0] == "Speaker0: we reviewed the plan"
+    assert "Speaker19:" not in content
+
+
+def test_filler_is_removed_before_whole_turns():
+    content = "\n".join(f"A: um so uh the the plan {i}" for i in range(8))
+    fitted, _ = token_budget.fit_content(content, 10, "task")
+    assert len(fitted.splitlines()) == 8
+    assert "um" not in fitted.split() and "the the" not in fitted
+
+
+def test_max_tokens_is_lowered_when_fixed_text_leaves_less_room():
+    fixed = " ".join(["w"] * 50)
+    content, max_tokens = token_budget.fit_content(transcript(5), 300, fixed)
+    assert max_tokens == 10
+    assert content == ""
+
+
+def test_instruction_longer_than_context_is_rejected():
+    with pytest.raises(ValueError):
+        token_budget.fit_content("x", 10, " ".join(["w"] * 61))
+
+
+def test_trim_to_budget_is_deterministic():
+    text = transcript(30)
+    assert token_budget.trim_to_budget(text, 25) == token_budget.trim_to_budget(text, 25)
@@ -0,0 +1,67 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from src.services import transcript_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(transcript_cache, "TRANSCRIPT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(transcript_cache, "TRANSCRIPT_CACHE_ENABLED", True)
+    return tmp_path
+
+
+def test_key_is_stable_for_same_audio_and_config():
+    audio = np.arange(1600, dtype=np.float32)
+    assert transcript_cache.cache_key(audio, {"vad": True}, "ref") == \
+        transcript_cache.cache_key(audio.copy(), {"vad": True}, "ref")
+
+
+def test_key_changes_with_audio_config_and_version(monkeypatch):
+    audio = np.arange(1600, dtype=np.float32)
+    key = transcript_cache.cache_key(audio, {"vad": True})
+    other_audio = audio.copy()
+    other_audio[0] = 1.0
+    assert transcript_cache.cache_key(other_audio, {"vad": True}) != key
+    assert transcript_cache.cache_key(audio, {"vad": False}) != key
+    monkeypatch.setattr(transcript_cache, "PIPELINE_VERSION", "next")
+    assert transcript_cache.cache_key(audio, {"vad": True}) != key
+
+
+def test_put_then_get_round_trips(cache_dir):
+    transcript_cache.put_cached("ab12", {"segments": [{"text": "hi"}]})
+    assert transcript_cache.get_cached("ab12") == {"segments": [{"text": "hi"}]}
+    assert transcript_cache.get_cached("cd34") is None
+
+
+def test_disabled_cache_stores_nothing(cache_dir, monkeypatch):
+    monkeypatch.setattr(transcript_cache, "TRANSCRIPT_CACHE_ENABLED", False)
+    transcript_cache.put_cached("ab12", [1])
+    assert transcript_cache.get_cached("ab12") is None
+    assert not any(cache_dir.iterdir())
+
+
+def test_expired_entry_is_dropped(cache_dir, monkeypatch):
+    monkeypatch.setattr(transcript_cache, "TRANSCRIPT_CACHE_MAX_AGE_SECONDS", 60)
+    transcript_cache.put_cached("ab12", [1])
+    path = transcript_cache._path("ab12")
+    old = time.time() - 120
+    os.utime(path, (old, old))
+    assert transcript_cache.get_cached("ab12") is None
+    assert not os.path.exists(path)
+
+
+def test_eviction_drops_least_recently_used_first(cache_dir, monkeypatch):
+    for number, key in enumerate(["aa01", "bb02", "cc03"]):
+        transcript_cache.put_cached(key, ["x" * 100])
+        stamp = time.time() - 100 + number
+        os.utime(transcript_cache._path(key), (stamp, stamp))
+    size = os.path.getsize(transcript_cache._path("aa01"))
+    monkeypatch.setattr(transcript_cache, "TRANSCRIPT_CACHE_MAX_BYTES", 2 * size)
+    transcript_cache.evict()
+    assert transcript_cache.get_cached("aa01") is None
+    assert transcript_cache.get_cached("bb02") is not None
+    assert transcript_cache.get_cached("cc03") is not None